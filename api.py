@@ -1,20 +1,24 @@
 import openai
+import requests
 import streamlit as st
 from dotenv import load_dotenv
 import os
-import shelve
-import unicodedata
-from fpdf import FPDF
-import base64
-
-def generate_pdf(content, filename):
-    content = unicodedata.normalize('NFKD', content).encode('ascii', 'ignore').decode('ascii')
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font('Arial', size=12)
-    pdf.multi_cell(0, 10, content)
-    pdf.output(filename)
-    return filename
+import time
+
+from engine import metrics, similarity
+from engine.client import BackendClient
+from engine.history import get_store, DEFAULT_SESSION
+from engine.metrics import timed
+from engine import course
+from engine.course import generate_module, stream_module, generate_outline, stream_outline
+from engine.outline import parse_modules, diff_outline, partition, fingerprint
+from engine.pdf import pdf_bytes
+from engine.pipeline import stream_ordered, MAX_IN_FLIGHT
+from engine.similarity import get_index, course_query
+from engine.scheduler import current_session
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+rerun_started = time.perf_counter()
 
 st.set_page_config(
     page_title="Automated Course Content Generator",
@@ -23,10 +27,35 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-load_dotenv()
+# Initialisation unique par processus : .env, serveur de métriques et clé OpenAI
+@st.cache_resource
+def init_process():
+    load_dotenv()
+    metrics.serve_from_env()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if api_key:
+        openai.api_key = api_key
+    return api_key
+
+@st.cache_resource
+def get_backend(base_url):
+    return BackendClient(base_url)
+
+api_key = init_process()
+
+# Avec EF2C_BACKEND_URL, le plan et les modules sont générés par le backend (backend.py)
+BACKEND_URL = os.getenv("EF2C_BACKEND_URL")
+backend = get_backend(BACKEND_URL) if BACKEND_URL else None
+
+# Chaque onglet est une session distincte pour le partage équitable du quota
+script_ctx = get_script_run_ctx()
+current_session.set(script_ctx.session_id if script_ctx else "default")
 
 with st.sidebar:
     language = st.selectbox("Select Language / Sélectionnez la langue", ["English", "Français"])
+    stream_mode = st.checkbox("Stream generation / Affichage progressif", value=True)
+    use_meta_prompt = st.checkbox("Prompter meta-prompt (extra call) / Méta-prompt Prompter", value=course.META_PROMPT)
+    reuse_similar = similarity.ENABLED and st.checkbox("Reuse similar modules / Réutiliser les modules similaires", value=True)
 
 translations = {
     "title": {"English": "Automated Course Content Generator 🤖", "Français": "Générateur de Contenu de Cours Automatisé 🤖"},
@@ -44,6 +73,7 @@ translations = {
     "generate_complete": {"English": "Generate Complete Course", "Français": "Générer le Cours Complet"},
     "modifications": {"English": "Make Modifications", "Français": "Faire des Modifications"},
     "delete_history": {"English": "Delete Chat History", "Français": "Supprimer l'Historique des Conversations"},
+    "module_select": {"English": "Module to display", "Français": "Module à afficher"},
 }
 
 st.title(translations["title"][language])
@@ -51,35 +81,194 @@ st.title(translations["title"][language])
 USER_AVATAR = "👤"
 BOT_AVATAR = "🤖"
 
-try:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("API Key not found.")
-    openai.api_key = api_key
-except Exception as e:
-    st.error(f"Error: {e}")
+if not api_key and not backend:
+    st.error("Error: API Key not found.")
 
 if "openai_model" not in st.session_state:
     st.session_state["openai_model"] = "gpt-3.5-turbo"
 
+history = get_store()
+history_session = st.query_params.get("session", DEFAULT_SESSION)
+
 def load_chat_history():
-    with shelve.open("chat_history") as db:
-        return db.get("messages", [])
+    return history.load(history_session)
 
 def save_chat_history(messages):
-    with shelve.open("chat_history") as db:
-        db["messages"] = messages
+    new_messages = messages[st.session_state.saved_messages:]
+    if new_messages:
+        history.append(history_session, new_messages)
+        st.session_state.saved_messages = len(messages)
 
 if "messages" not in st.session_state:
     st.session_state.messages = load_chat_history()
+    st.session_state.saved_messages = len(st.session_state.messages)
 
 if "course_modules" not in st.session_state:
     st.session_state.course_modules = []
 
+if "failed_modules" not in st.session_state:
+    st.session_state.failed_modules = []
+
+# Modules déjà générés, indexés par (cours, modèle, numéro et empreinte du
+# module dans le plan) : le prompt et le texte du module citent son numéro
+if "module_results" not in st.session_state:
+    st.session_state.module_results = {}
+
+def outline_modules():
+    entries = parse_modules(st.session_state.get("course_outline"))
+    if entries:
+        return entries
+    # Plan sans « Module N » reconnaissable : numérotation seule
+    return [
+        {"number": number, "title": "", "lines": [], "text": "", "fingerprint": fingerprint(number)}
+        for number in range(1, st.session_state.num_modules + 1)
+    ]
+
+def module_key(entry):
+    return fingerprint(course_name, st.session_state["openai_model"], entry["number"], entry["fingerprint"])
+
+def assemble_modules(entries):
+    st.session_state.course_modules = [
+        f"Module {entry['number']}: {st.session_state.module_results[module_key(entry)]}"
+        if module_key(entry) in st.session_state.module_results else None
+        for entry in entries
+    ]
+
+def store_module(entry, result):
+    st.session_state.module_results[module_key(entry)] = result
+    if similarity.ENABLED and entry["text"]:
+        get_index().add("module", entry["text"].split("\n")[0], result, source=course_name,
+                        query=course_query(course_name, entry["text"]))
+
+# Suit un travail du backend. Son identifiant est gardé dans l'URL
+# (?<param>=id) pour le reprendre après une reconnexion ; il est retiré même
+# en cas d'échec ou de dépassement du délai. on_done(params, result).
+def follow_job(param, job_id, label, on_done):
+    st.query_params[param] = job_id
+    progress = st.progress(0.0)
+    try:
+        params = backend.status(job_id)["params"]
+        result = backend.wait(
+            job_id,
+            on_progress=lambda done, total: progress.progress(done / total if total else 0.0, text=f"{done}/{total} {label}"),
+        )
+        on_done(params, result)
+    except (RuntimeError, TimeoutError, requests.RequestException) as e:
+        progress.empty()
+        st.error(f"Generation failed: {e}")
+    finally:
+        if param in st.query_params:
+            del st.query_params[param]
+
+def store_outline(course_outline):
+    st.success("Course outline generated successfully!")
+    st.session_state['course_outline'] = course_outline
+    st.session_state['buttons_visible'] = True
+
+def on_outline_job_done(params, result):
+    store_outline(result["outline"])
+
+# Modules renvoyés par le backend. Si le plan est encore en session, ils sont
+# enregistrés comme des modules générés en local ; après une reconnexion, ils
+# sont seulement affichés.
+def on_modules_job_done(params, result):
+    st.session_state.failed_modules = result["failed"]
+    if "course_outline" not in st.session_state:
+        st.session_state.course_modules = [
+            f"Module {number}: {module}" for number, module in sorted(result["modules"].items(), key=lambda item: int(item[0]))
+        ]
+        return
+    entries = outline_modules()
+    for entry in entries:
+        if str(entry["number"]) in result["modules"]:
+            store_module(entry, result["modules"][str(entry["number"])])
+    assemble_modules(entries)
+
+# Modules générés par le backend (travail « modules ») ; la progression suit
+# les modules terminés
+def generate_modules_remote(entries):
+    job_id = backend.submit("modules", {
+        "course_name": course_name,
+        "model": st.session_state["openai_model"],
+        "numbers": [entry["number"] for entry in entries],
+        "outlines": {str(entry["number"]): entry["text"] for entry in entries if entry["text"]},
+        "session": current_session.get(),
+    })
+    follow_job("modules_job", job_id, "modules", on_modules_job_done)
+
+def generate_modules(entries):
+    model = st.session_state["openai_model"]
+    progress = st.progress(0.0)
+    live = [st.empty() for _ in entries] if stream_mode else []
+    done = []
+
+    def run(entry, emit):
+        if not stream_mode:
+            return generate_module(course_name, entry["number"], model, entry["text"])
+        parts = []
+        for delta in stream_module(course_name, entry["number"], model, entry["text"]):
+            parts.append(delta)
+            emit(delta)
+        return "".join(parts)
+
+    def on_module_delta(index, text):
+        tail = text if len(text) <= 2000 else "…" + text[-2000:]
+        live[index].markdown(f"**Module {entries[index]['number']}**\n\n{tail}")
+
+    def on_module_done(index, result):
+        done.append(index)
+        if live:
+            live[index].empty()
+        if not isinstance(result, Exception):
+            store_module(entries[index], result)
+        progress.progress(len(done) / len(entries), text=f"{len(done)}/{len(entries)} modules")
+
+    results = stream_ordered(
+        run,
+        entries,
+        max_in_flight=MAX_IN_FLIGHT,
+        on_delta=on_module_delta if stream_mode else None,
+        on_result=on_module_done,
+        retries=2,
+        return_exceptions=True,
+    )
+    st.session_state.failed_modules = [
+        entry["number"] for entry, result in zip(entries, results) if isinstance(result, Exception)
+    ]
+
+# Ne génère que les modules ajoutés ou modifiés depuis la dernière génération ;
+# les autres sont repris tels quels (leur PDF reste en cache)
+def build_course():
+    entries = outline_modules()
+    reused, pending = partition(entries, st.session_state.module_results, key=module_key)
+    if reused and pending:
+        st.info(f"Regenerating modules {', '.join(str(entries[index]['number']) for index in pending)}; {len(reused)} unchanged modules reused.")
+    # Modules quasi identiques (titre et leçons) à un module d'un autre cours
+    if reuse_similar and pending:
+        index = get_index()
+        for position in list(pending):
+            entry = entries[position]
+            if not entry["text"]:
+                continue
+            hit = index.lookup("module", course_query(course_name, entry["text"]))
+            if hit is None or hit["source"] == course_name:
+                continue
+            st.info(f"Module {entry['number']} reused from \"{hit['title']}\" ({hit['source']}, similarity {hit['score']:.2f}).")
+            st.session_state.module_results[module_key(entry)] = hit["content"]
+            pending.remove(position)
+    if pending and backend:
+        generate_modules_remote([entries[index] for index in pending])
+    elif pending:
+        generate_modules([entries[index] for index in pending])
+    else:
+        st.session_state.failed_modules = []
+    assemble_modules(entries)
+
 with st.sidebar:
     if st.button(translations["delete_history"][language]):
         st.session_state.messages = []
-        save_chat_history([])
+        st.session_state.saved_messages = 0
+        history.clear(history_session)
 
 col1, col_divider, col2 = st.columns([3.0, 0.1, 7.0])
 
@@ -126,31 +315,34 @@ with col1:
 
 with col2:
     st.header(translations["content_header"][language])
+    # Reprise des travaux en cours après une reconnexion
+    if backend and "outline_job" in st.query_params and "course_outline" not in st.session_state:
+        with st.spinner("Resuming course outline..."):
+            follow_job("outline_job", st.query_params["outline_job"], "outline", on_outline_job_done)
+    if backend and "modules_job" in st.query_params:
+        with st.spinner("Resuming course modules..."):
+            follow_job("modules_job", st.query_params["modules_job"], "modules", on_modules_job_done)
     if generate_button and "pdf" not in st.session_state:
         user_selections = f"{translations['course_name'][language]}: {course_name}\n{translations['target_audience'][language]}: {target_audience_edu_level}\n{translations['difficulty_level'][language]}: {difficulty_level}\n{translations['modules'][language]}: {num_modules}\n{translations['duration'][language]}: {course_duration}\n{translations['credit'][language]}: {course_credit}"
         st.session_state.messages.append({"role": "user", "content": user_selections})
 
-        PROMPT = f"You are Prompter. Generate a detailed prompt for Tabler using these inputs: 1) Course Name: {course_name} 2) Target Audience Edu Level: {target_audience_edu_level} 3) Course Difficulty Level: {difficulty_level} 4) No. of Modules: {num_modules} 5) Course Duration: {course_duration} 6) Course Credit: {course_credit}."
-
-        response = openai.ChatCompletion.create(
-            model=st.session_state["openai_model"],
-            messages=[
-                {"role": "system", "content": PROMPT},
-            ]
-        )
-        generated_prompt = response.choices[0].message["content"]
+        outline_args = (course_name, target_audience_edu_level, difficulty_level, num_modules, course_duration, course_credit)
 
         with st.spinner("Generating course outline..."):
-            response = openai.ChatCompletion.create(
-                model=st.session_state["openai_model"],
-                messages=[
-                    {"role": "system", "content": generated_prompt},
-                ]
-            )
-            course_outline = response.choices[0].message["content"]
-            st.success("Course outline generated successfully!")
-            st.session_state['course_outline'] = course_outline
-            st.session_state['buttons_visible'] = True
+            if backend:
+                job_id = backend.submit("outline", {
+                    "course_name": course_name, "audience": target_audience_edu_level, "difficulty": difficulty_level,
+                    "num_modules": num_modules, "duration": course_duration, "credit": course_credit,
+                    "model": st.session_state["openai_model"], "use_meta_prompt": use_meta_prompt,
+                    "session": current_session.get(),
+                })
+                follow_job("outline_job", job_id, "outline", on_outline_job_done)
+            else:
+                if stream_mode:
+                    course_outline = st.write_stream(stream_outline(*outline_args, model=st.session_state["openai_model"], use_meta_prompt=use_meta_prompt))
+                else:
+                    course_outline = generate_outline(*outline_args, model=st.session_state["openai_model"], use_meta_prompt=use_meta_prompt)
+                store_outline(course_outline)
 
     if 'course_outline' in st.session_state and "pdf" not in st.session_state:
         with st.expander(translations["outline"][language]):
@@ -163,36 +355,58 @@ with col2:
             with button2:
                 modifications_button = st.button(translations["modifications"][language])
 
+            if modifications_button:
+                st.session_state.editing_outline = True
+
+            if st.session_state.get("editing_outline"):
+                with st.form("outline_form"):
+                    edited_outline = st.text_area(translations["outline"][language], st.session_state['course_outline'], height=400)
+                    save_outline = st.form_submit_button("Save")
+                if save_outline:
+                    changes = diff_outline(parse_modules(st.session_state['course_outline']), parse_modules(edited_outline))
+                    st.session_state['course_outline'] = edited_outline
+                    st.session_state.editing_outline = False
+                    if any(changes[kind] for kind in ("added", "changed", "removed")):
+                        st.info(f"Added: {changes['added'] or '-'} · Changed: {changes['changed'] or '-'} · Removed: {changes['removed'] or '-'}")
+                    # Cours déjà généré : mise à jour immédiate des seuls modules touchés
+                    if st.session_state.course_modules:
+                        complete_course_button = True
+
             if complete_course_button:
                 with st.spinner("Generating complete course by module..."):
-                    modules = []
-                    for i in range(1, st.session_state.num_modules + 1):
-                        module_prompt = f"Generate detailed content for Module {i} of the course: {course_name}. The module should include an introduction, main content, examples, and a summary."
-                        response = openai.ChatCompletion.create(
-                            model=st.session_state["openai_model"],
-                            messages=[
-                                {"role": "system", "content": module_prompt},
-                            ]
-                        )
-                        module_content = response.choices[0].message["content"]
-                        modules.append(f"Module {i}: {module_content}")
-                    
-                    st.session_state.course_modules = modules
-                    st.success("Complete course content generated successfully!")
-
-if st.session_state.course_modules:
-    for module in st.session_state.course_modules:
-        with st.expander(module.split(':')[0]):
-            st.write(module)
-            pdf_file = generate_pdf(module, f"{module.split(':')[0].strip()}.pdf")
-            if pdf_file:
-                with open(pdf_file, "rb") as pdf:
-                    b64 = base64.b64encode(pdf.read()).decode('latin1')
-                st.download_button(
-                    label=f"{translations['outline'][language]} {module.split(':')[0]} PDF",
-                    data=b64,
-                    file_name=f"{module.split(':')[0].strip()}.pdf",
-                    mime="application/pdf"
-                )
+                    build_course()
+                    if not st.session_state.failed_modules:
+                        st.success("Complete course content generated successfully!")
+
+            if st.session_state.failed_modules:
+                st.warning(f"Failed modules: {', '.join(map(str, st.session_state.failed_modules))}")
+                if st.button("Retry failed modules"):
+                    with st.spinner("Retrying failed modules..."):
+                        build_course()
+                        if not st.session_state.failed_modules:
+                            st.success("Complete course content generated successfully!")
+
+# Panneau des modules en fragment : changer de module ou télécharger ne relance
+# que ce panneau, et seul le module choisi est rendu (coût fixe quelle que soit
+# la taille du cours)
+@st.fragment
+def modules_panel(modules, language):
+    with timed("panel"):
+        titles = [module.split(':')[0] for module in modules]
+        choice = st.selectbox(translations["module_select"][language], range(len(modules)), format_func=lambda index: titles[index])
+        module = modules[choice]
+        st.subheader(titles[choice])
+        st.write(module)
+        st.download_button(
+            label=f"{translations['outline'][language]} {titles[choice]} PDF",
+            data=pdf_bytes(module, ascii_only=True),
+            file_name=f"{titles[choice].strip()}.pdf",
+            mime="application/pdf"
+        )
+
+modules = list(filter(None, st.session_state.course_modules))
+if modules:
+    modules_panel(modules, language)
 
 save_chat_history(st.session_state.messages)
+metrics.metrics.record("rerun", time.perf_counter() - rerun_started)
@@ -1,77 +1,202 @@
 import openai
+import requests
 import streamlit as st
-from fpdf import FPDF
 import os
+import time
 
-# Interface de saisie de la clé API
-st.sidebar.subheader("Authentification OpenAI")
-user_api_key = st.sidebar.text_input("Entrez votre clé API OpenAI", type="password")
+from engine import metrics, similarity
+from engine.client import BackendClient
+from engine.course import (
+    generate_course_plan, generate_chapter_content, generate_quiz, extract_chapters,
+    stream_course_plan, stream_chapter_content,
+)
+from engine.course_pdf import CoursePdfBuilder
+from engine.metrics import timed
+from engine.outline import parse_chapters, diff_outline, partition
+from engine.pdf import pdf_bytes
+from engine.pipeline import generate_chapters
+from engine.similarity import get_index, course_query
+from engine.scheduler import current_session
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+rerun_started = time.perf_counter()
+
+# Ressources créées une seule fois par processus, pas à chaque relance du script
+@st.cache_resource
+def init_process():
+    return metrics.serve_from_env()
+
+@st.cache_resource
+def get_backend(base_url):
+    return BackendClient(base_url)
+
+init_process()
+
+# Chaque onglet est une session distincte pour le partage équitable du quota
+script_ctx = get_script_run_ctx()
+current_session.set(script_ctx.session_id if script_ctx else "default")
 
-if user_api_key:
-    openai.api_key = user_api_key
+# Avec EF2C_BACKEND_URL, la génération est déléguée au backend (backend.py)
+BACKEND_URL = os.getenv("EF2C_BACKEND_URL")
+backend = get_backend(BACKEND_URL) if BACKEND_URL else None
+
+# Interface de saisie de la clé API
+if backend:
+    user_api_key = None
+    st.sidebar.info("Génération déléguée au serveur EF2C.")
 else:
-    st.sidebar.warning("Veuillez entrer votre clé API OpenAI pour continuer.")
+    st.sidebar.subheader("Authentification OpenAI")
+    user_api_key = st.sidebar.text_input("Entrez votre clé API OpenAI", type="password")
+
+    if user_api_key:
+        openai.api_key = user_api_key
+    else:
+        st.sidebar.warning("Veuillez entrer votre clé API OpenAI pour continuer.")
+
+api_ready = bool(user_api_key or backend)
 
 # Fonction pour générer un PDF
 def generate_pdf(content, filename):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.add_font('DejaVu', '', 'DejaVuSans.ttf', uni=True)
-    pdf.set_font('DejaVu', size=12)
-    pdf.multi_cell(0, 10, content)
-    pdf.output(filename)
+    with open(filename, "wb") as pdf:
+        pdf.write(pdf_bytes(content))
     return filename
 
-# Fonction pour générer le plan du cours
-def generate_course_plan(title, duration, audience, objectives, num_chapters):
-    prompt = f"""
-    Crée un plan complet et très détaillé pour une formation intitulée "{title}".
-
-    Détails :
-    - Durée : {duration}
-    - Public concerné : {audience}
-    - Contenu de la formation : {objectives}
-    - Nombre de chapitres : {num_chapters}
-
-    Le plan doit inclure :
-    1. Les prérequis nécessaires pour suivre cette formation.
-    2. L'objectif final de la formation (reprenant les objectifs indiqués).
-    3. Une liste des chapitres avec :
-       - Un titre pour chaque chapitre.
-       - Une description très détaillée pour chaque chapitre (6 à 8 lignes).
-       - Une énumération des sous-chapitres avec leurs titres et une brève explication.
-    4. Une conclusion résumant les points clés de la formation et comment les objectifs seront atteints.
-    """
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response.choices[0].message["content"]
-
-# Fonction pour générer le contenu détaillé d’un chapitre
-def generate_chapter_content(chapter_title):
-    prompt = f"""
-    Crée un contenu extrêmement détaillé et structuré pour le chapitre : "{chapter_title}".
-    
-    Le contenu doit inclure environ 15 à 25 pages, détaillé et structuré avec exemples, cas pratiques, exercices, et bonnes pratiques.
-    """
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response.choices[0].message["content"]
-
-# Fonction pour générer un quiz
-def generate_quiz(chapter_content, num_questions=5):
-    prompt = f"""
-    Générez un quiz de {num_questions} questions à choix multiples basé sur : {chapter_content}
-    Chaque question doit avoir 4 options avec une seule réponse correcte clairement indiquée.
-    """
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response.choices[0].message["content"]
+# Fonction pour suivre un travail du backend. Son identifiant est gardé dans
+# l'URL (?<param>=id) pour le reprendre après une reconnexion ; il est retiré
+# même si le travail a échoué, n'existe plus (backend redémarré) ou dépasse le
+# délai d'attente, pour ne pas bloquer la page. on_done(params, result).
+def follow_job(param, job_id, label, on_done):
+    st.query_params[param] = job_id
+    progress = st.progress(0.0)
+    try:
+        params = backend.status(job_id)["params"]
+        result = backend.wait(
+            job_id,
+            on_progress=lambda done, total: progress.progress(done / total if total else 0.0, text=f"{done}/{total} {label}"),
+        )
+        on_done(params, result)
+    except (RuntimeError, TimeoutError, requests.RequestException) as e:
+        progress.empty()
+        st.error(f"La génération a échoué : {e}")
+    finally:
+        if param in st.query_params:
+            del st.query_params[param]
+
+# Fonction pour enregistrer le plan du cours et son PDF
+def store_plan(course_plan, title, duration, audience, objectives):
+    st.session_state["course_plan"] = course_plan
+    st.session_state["title"] = title
+    st.session_state["duration"] = duration
+    st.session_state["audience"] = audience
+    st.session_state["objectives"] = objectives
+
+    os.makedirs("cours/plan", exist_ok=True)
+    plan_pdf_path = f"cours/plan/plan_{title.replace(' ', '_')}.pdf"
+    generate_pdf(course_plan, plan_pdf_path)
+
+    with open(plan_pdf_path, "rb") as pdf:
+        st.download_button(
+            label="Télécharger le Plan du cours",
+            data=pdf,
+            file_name=f"plan_{title.replace(' ', '_')}.pdf",
+            mime="application/pdf"
+        )
+
+def on_plan_job_done(params, result):
+    store_plan(result["plan"], params["title"], params["duration"], params["audience"], params["objectives"])
+
+def on_chapters_job_done(job_id):
+    def on_done(params, result):
+        st.session_state["chapters"] = [tuple(chapter) for chapter in result["chapters"]]
+        st.session_state["download_link"] = backend.pdf(job_id)
+        chapters_pdf_path = f"cours/chapitres/{params['pdf']['title'].replace(' ', '_')}.pdf"
+        os.makedirs(os.path.dirname(chapters_pdf_path), exist_ok=True)
+        with open(chapters_pdf_path, "wb") as pdf:
+            pdf.write(st.session_state["download_link"])
+
+    return on_done
+
+# Fonction pour générer les chapitres du plan en local. Les chapitres déjà
+# générés (même titre, à la numérotation près) sont repris avec leur quiz et
+# leur segment PDF ; seuls les chapitres ajoutés ou modifiés sont générés.
+def build_chapters():
+    entries = parse_chapters(st.session_state["course_plan"])
+    chapters = [entry["title"] for entry in entries]
+    reused, pending = partition(entries, st.session_state["chapter_results"])
+    if reused and pending:
+        st.info(f"{len(pending)} chapitre(s) à régénérer, {len(reused)} repris sans changement.")
+
+    # Chapitres quasi identiques à un chapitre d'un cours précédent : contenu
+    # (et quiz s'il existe) repris depuis l'index au lieu d'être générés. Comme
+    # pour les PDF importés, seul le titre est comparé : le contenu d'un
+    # chapitre ne dépend que de son titre.
+    chapters_pdf_path = f"cours/chapitres/{st.session_state['title'].replace(' ', '_')}.pdf"
+    similar_content = {}
+    if reuse_similar and pending:
+        index = get_index()
+        for position in list(pending):
+            hit = index.lookup("chapter", course_query(st.session_state["title"], chapters[position]))
+            if hit is None or hit["source"] == chapters_pdf_path:
+                continue
+            st.info(f"« {chapters[position]} » repris de « {hit['title']} » ({os.path.basename(hit['source'])}, similarité {hit['score']:.2f}).")
+            if hit["quiz"]:
+                reused[position] = (chapters[position], hit["content"], hit["quiz"])
+                st.session_state["chapter_results"][entries[position]["fingerprint"]] = reused[position]
+                pending.remove(position)
+            else:
+                similar_content[chapters[position]] = hit["content"]
+
+    def content_for(chapter_title):
+        if chapter_title in similar_content:
+            return [similar_content[chapter_title]] if stream_mode else similar_content[chapter_title]
+        return (stream_chapter_content if stream_mode else generate_chapter_content)(chapter_title)
+
+    progress = st.progress(0.0)
+    completed = []
+
+    header = f"Titre : {st.session_state['title']}\nDurée : {st.session_state['duration']}\nObjectifs : {st.session_state['objectives']}\n\nListe des chapitres :\n" + "\n".join(chapters)
+    course_pdf = CoursePdfBuilder(chapters_pdf_path, st.session_state["title"], header)
+    results = [None] * len(entries)
+    for index, (_, chapter_content, quiz_content) in reused.items():
+        results[index] = (chapters[index], chapter_content, quiz_content)
+        course_pdf.add_chapter(index + 1, *results[index])
+
+    def on_chapter_done(position, result):
+        index = pending[position]
+        completed.append(index)
+        results[index] = result
+        st.session_state["chapter_results"][entries[index]["fingerprint"]] = result
+        course_pdf.add_chapter(index + 1, *result)
+        if similarity.ENABLED:
+            get_index().add("chapter", *result, source=chapters_pdf_path,
+                            query=course_query(st.session_state["title"], chapters[index]))
+        progress.progress(len(completed) / len(pending), text=f"{len(completed)}/{len(pending)} chapitres générés")
+
+    live = [st.empty() for _ in pending] if stream_mode else []
+
+    def on_chapter_delta(position, text):
+        tail = text if len(text) <= 2000 else "…" + text[-2000:]
+        live[position].markdown(f"**{chapters[pending[position]]}**\n\n{tail}")
+
+    try:
+        generate_chapters(
+            [chapters[index] for index in pending],
+            content_for,
+            generate_quiz,
+            on_result=on_chapter_done,
+            on_delta=on_chapter_delta if stream_mode else None,
+        )
+    except Exception:
+        course_pdf.discard()
+        raise
+    for placeholder in live:
+        placeholder.empty()
+
+    course_pdf.close()
+    st.session_state["chapters"] = results
+
+    with open(chapters_pdf_path, "rb") as pdf:
+        st.session_state["download_link"] = pdf.read()
 
 # Interface principale
 st.title("EF2C AI - Générateur de Contenu de Cours")
@@ -82,77 +207,100 @@ duration = st.sidebar.text_input("Durée de la formation")
 audience = st.sidebar.text_area("Public concerné")
 objectives = st.sidebar.text_area("Contenu de la formation")
 num_chapters = st.sidebar.slider("Nombre de chapitres", 1, 15, 5)
+stream_mode = st.sidebar.checkbox("Affichage progressif (streaming)", value=True)
+reuse_similar = similarity.ENABLED and st.sidebar.checkbox("Réutiliser les chapitres similaires déjà générés", value=True)
+
+# Reprise des travaux en cours après une reconnexion
+if backend and "plan_job" in st.query_params and "course_plan" not in st.session_state:
+    with st.spinner("Reprise de la génération du plan..."):
+        follow_job("plan_job", st.query_params["plan_job"], "plan", on_plan_job_done)
+
+if backend and "job" in st.query_params and "chapters" not in st.session_state:
+    with st.spinner("Reprise de la génération des chapitres..."):
+        follow_job("job", st.query_params["job"], "chapitres générés", on_chapters_job_done(st.query_params["job"]))
 
 if st.sidebar.button("Générer le plan du cours"):
-    if not user_api_key:
+    if not api_ready:
         st.sidebar.error("Veuillez entrer votre clé API.")
     elif all([title, duration, audience, objectives]):
         with st.spinner("Génération du plan du cours..."):
-            course_plan = generate_course_plan(title, duration, audience, objectives, num_chapters)
-            st.session_state["course_plan"] = course_plan
-            st.session_state["title"] = title
-            st.session_state["duration"] = duration
-            st.session_state["audience"] = audience
-            st.session_state["objectives"] = objectives
-
-            os.makedirs("cours/plan", exist_ok=True)
-            plan_pdf_path = f"cours/plan/plan_{title.replace(' ', '_')}.pdf"
-            generate_pdf(course_plan, plan_pdf_path)
-
-            with open(plan_pdf_path, "rb") as pdf:
-                st.download_button(
-                    label="Télécharger le Plan du cours",
-                    data=pdf,
-                    file_name=f"plan_{title.replace(' ', '_')}.pdf",
-                    mime="application/pdf"
-                )
+            if backend:
+                job_id = backend.submit("plan", {
+                    "title": title, "duration": duration, "audience": audience,
+                    "objectives": objectives, "num_chapters": num_chapters,
+                })
+                follow_job("plan_job", job_id, "plan", on_plan_job_done)
+            else:
+                if stream_mode:
+                    live_plan = st.empty()
+                    with live_plan.container():
+                        course_plan = st.write_stream(stream_course_plan(title, duration, audience, objectives, num_chapters))
+                    live_plan.empty()
+                else:
+                    course_plan = generate_course_plan(title, duration, audience, objectives, num_chapters)
+                store_plan(course_plan, title, duration, audience, objectives)
     else:
         st.sidebar.error("Veuillez remplir tous les champs.")
 
+if "chapter_results" not in st.session_state:
+    st.session_state["chapter_results"] = {}
+
 if "course_plan" in st.session_state:
     st.header("Plan du cours")
     st.text(st.session_state["course_plan"])
 
+    with st.expander("Modifier le plan"):
+        with st.form("plan_form"):
+            edited_plan = st.text_area("Plan du cours", st.session_state["course_plan"], height=400)
+            save_plan = st.form_submit_button("Enregistrer les modifications")
+    if save_plan and edited_plan != st.session_state["course_plan"]:
+        changes = diff_outline(parse_chapters(st.session_state["course_plan"]), parse_chapters(edited_plan))
+        st.session_state["course_plan"] = edited_plan
+        # Chapitres déjà générés en local : seuls les chapitres touchés sont régénérés
+        if "chapters" in st.session_state and not backend:
+            if any(changes[kind] for kind in ("added", "changed", "removed")):
+                with st.spinner("Mise à jour des chapitres modifiés..."):
+                    build_chapters()
+        else:
+            st.session_state.pop("chapters", None)
+        st.rerun()
+
 if "chapters" not in st.session_state and "course_plan" in st.session_state:
     if st.button("Générer les chapitres"):
-        if not user_api_key:
+        if not api_ready:
             st.error("Veuillez entrer votre clé API.")
+        elif backend:
+            with st.spinner("Génération des chapitres, contenus et quiz..."):
+                chapters = extract_chapters(st.session_state["course_plan"])
+                header = f"Titre : {st.session_state['title']}\nDurée : {st.session_state['duration']}\nObjectifs : {st.session_state['objectives']}\n\nListe des chapitres :\n" + "\n".join(chapters)
+                job_id = backend.submit("chapters", {"titles": chapters, "pdf": {"title": st.session_state["title"], "header": header}})
+                follow_job("job", job_id, "chapitres générés", on_chapters_job_done(job_id))
         else:
             with st.spinner("Génération des chapitres, contenus et quiz..."):
-                lines = st.session_state["course_plan"].splitlines()
-                chapters = [line for line in lines if line.strip().startswith("Chapitre")]
-                st.session_state["chapters"] = []
-
-                full_course_content = f"Titre : {st.session_state['title']}\nDurée : {st.session_state['duration']}\nObjectifs : {st.session_state['objectives']}\n\nListe des chapitres :\n"
-
-                for chapter in chapters:
-                    chapter_title = chapter.strip()
-                    chapter_content = generate_chapter_content(chapter_title)
-                    quiz_content = generate_quiz(chapter_content)
+                build_chapters()
 
-                    st.session_state["chapters"].append((chapter_title, chapter_content, quiz_content))
+# Panneau des chapitres en fragment : changer de chapitre ou télécharger ne
+# relance que ce panneau, et seul le chapitre choisi est rendu (coût fixe
+# quelle que soit la taille du cours)
+@st.fragment
+def chapters_panel(chapters, download_name):
+    with timed("panel"):
+        choice = st.selectbox("Chapitre à afficher", range(len(chapters)), format_func=lambda index: chapters[index][0])
+        chapter_title, chapter_content, quiz_content = chapters[choice]
+        st.subheader(chapter_title)
+        st.write(chapter_content)
+        st.subheader("Quiz")
+        st.text(quiz_content)
 
-                    full_course_content += f"\n\n{chapter_title}\n\n{chapter_content}\n\nQuiz:\n{quiz_content}\n\n"
+        if "download_link" in st.session_state:
+            st.download_button(
+                label="Télécharger le PDF complet",
+                data=st.session_state["download_link"],
+                file_name=download_name,
+                mime="application/pdf"
+            )
 
-                os.makedirs("cours/chapitres", exist_ok=True)
-                chapters_pdf_path = f"cours/chapitres/{title.replace(' ', '_')}.pdf"
-                generate_pdf(full_course_content, chapters_pdf_path)
+if st.session_state.get("chapters"):
+    chapters_panel(st.session_state["chapters"], f"{title.replace(' ', '_')}.pdf")
 
-                with open(chapters_pdf_path, "rb") as pdf:
-                    st.session_state["download_link"] = pdf.read()
-
-if "chapters" in st.session_state:
-    for chapter_title, chapter_content, quiz_content in st.session_state["chapters"]:
-        with st.expander(chapter_title):
-            st.subheader("Contenu")
-            st.write(chapter_content)
-            st.subheader("Quiz")
-            st.text(quiz_content)
-
-    if "download_link" in st.session_state:
-        st.download_button(
-            label="Télécharger le PDF complet",
-            data=st.session_state["download_link"],
-            file_name=f"{title.replace(' ', '_')}.pdf",
-            mime="application/pdf"
-        )
+metrics.metrics.record("rerun", time.perf_counter() - rerun_started)
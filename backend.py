@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import secrets
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
+
+from engine import llm
+from engine.jobs import JobQueue
+from engine.metrics import metrics
+
+load_dotenv()
+llm.configure(api_key=os.getenv("OPENAI_API_KEY"))
+
+# Jeton partagé avec les clients (en-tête X-EF2C-Token) : sans lui, n'importe
+# qui atteignant le serveur dépenserait le quota OpenAI de .env
+BACKEND_TOKEN = os.getenv("EF2C_BACKEND_TOKEN", "")
+TOKEN_HEADER = "X-EF2C-Token"
+
+app = FastAPI(title="EF2C AI backend")
+# Aucune origine tierce par défaut ; EF2C_CORS_ORIGINS liste les origines autorisées
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=[origin for origin in os.getenv("EF2C_CORS_ORIGINS", "").split(",") if origin],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", TOKEN_HEADER],
+)
+
+
+def check_token(x_ef2c_token: str = Header(default="")):
+    if not BACKEND_TOKEN:
+        raise HTTPException(status_code=503, detail="EF2C_BACKEND_TOKEN n'est pas configuré")
+    if not secrets.compare_digest(x_ef2c_token.encode("utf-8"), BACKEND_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Jeton invalide")
+
+
+router = APIRouter(dependencies=[Depends(check_token)])
+
+jobs = JobQueue()
+metrics.register_gauges("ef2c_jobs", jobs.stats)
+
+
+class JobRequest(BaseModel):
+    kind: str
+    params: dict = {}
+
+
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Travail introuvable")
+    return job
+
+
+@router.post("/jobs")
+def submit_job(request: JobRequest):
+    try:
+        job = jobs.submit(request.kind, request.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return get_job(job_id).to_dict()
+
+
+@router.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = get_job(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Travail {job.status}")
+    return job.result
+
+
+@router.get("/jobs/{job_id}/pdf")
+def job_pdf(job_id: str):
+    job = get_job(job_id)
+    if job.pdf is None:
+        raise HTTPException(status_code=404, detail="Pas de PDF pour ce travail")
+    return Response(job.pdf, media_type="application/pdf")
+
+
+# Progression poussée en Server-Sent Events jusqu'à la fin du travail
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = get_job(job_id)
+
+    async def stream():
+        cursor = 0
+        while True:
+            events = await asyncio.to_thread(job.wait_events, cursor)
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            cursor += len(events)
+            for event in events:
+                yield f"data: {json.dumps(event)}\n\n"
+            if job.status in ("done", "failed") and events[-1]["type"] in ("done", "failed"):
+                return
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+app.include_router(router)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return metrics.prometheus()
@@ -0,0 +1,39 @@
+import argparse
+import time
+
+from bench.mock_openai import start_server
+from engine import cache, llm
+from engine.course import generate_chapter_content, generate_quiz
+from engine.pipeline import generate_chapters
+
+
+# Compare la génération séquentielle et parallèle des chapitres contre le mock
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de génération des chapitres")
+    parser.add_argument("--chapters", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    args = parser.parse_args()
+
+    server, base = start_server(latency=args.latency)
+    llm.configure(api_key="sk-mock", base=base)
+    cache.ENABLED = False
+    titles = [f"Chapitre {i}: Sujet {i}" for i in range(1, args.chapters + 1)]
+
+    start = time.perf_counter()
+    for chapter_title in titles:
+        generate_quiz(generate_chapter_content(chapter_title))
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    generate_chapters(titles, generate_chapter_content, generate_quiz, max_in_flight=args.max_in_flight)
+    parallel = time.perf_counter() - start
+
+    server.shutdown()
+    print(f"{args.chapters} chapitres, latence {args.latency}s")
+    print(f"séquentiel : {serial:.2f}s")
+    print(f"parallèle ({args.max_in_flight} en vol) : {parallel:.2f}s  (x{serial / parallel:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from fpdf import FPDF
+
+from engine.course_pdf import build_course_pdf, get_pool
+from engine.pdf import FONT_PATH
+
+
+def fake_chapters(count, chars):
+    paragraph = "Contenu détaillé du chapitre avec exemples et exercices. "
+    body = (paragraph * (chars // len(paragraph) + 1))[:chars]
+    for i in range(1, count + 1):
+        yield f"Chapitre {i}: Sujet {i}", body, "1. Question ?\nA) oui B) non\nRéponse : A"
+
+
+# Ancien rendu d'app.py : concaténation de tout le cours puis un seul multi_cell
+def legacy(path, count, chars):
+    content = "Titre : Benchmark\n\nListe des chapitres :\n"
+    for chapter_title, chapter_content, quiz_content in fake_chapters(count, chars):
+        content += f"\n\n{chapter_title}\n\n{chapter_content}\n\nQuiz:\n{quiz_content}\n\n"
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.add_font('DejaVu', '', FONT_PATH)
+    pdf.set_font('DejaVu', size=12)
+    pdf.multi_cell(0, 10, content)
+    pdf.output(path)
+
+
+def builder(path, count, chars):
+    build_course_pdf(path, "Benchmark", "Liste des chapitres", fake_chapters(count, chars))
+    pool = get_pool()
+    if pool:
+        # Attend la fin des workers pour que leur RSS soit comptabilisé
+        pool.shutdown()
+
+
+def peak_rss_mb():
+    # ru_maxrss est en Ko sous Linux ; les processus du pool sont comptés à part
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, children / 1024
+
+
+def run_case(mode, count, chars):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "course.pdf")
+        start = time.perf_counter()
+        {"legacy": legacy, "builder": builder}[mode](path, count, chars)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+    own, children = peak_rss_mb()
+    return {"mode": mode, "chapters": count, "seconds": round(elapsed, 2),
+            "peak_rss_mb": round(own, 1), "peak_worker_rss_mb": round(children, 1), "bytes": size}
+
+
+# Chaque cas tourne dans un processus neuf pour isoler le pic de mémoire
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du PDF complet d'un cours")
+    parser.add_argument("--chapters", type=int, nargs="+", default=[5, 15, 50])
+    parser.add_argument("--chars", type=int, default=8000)
+    parser.add_argument("--modes", nargs="+", default=["legacy", "builder"])
+    parser.add_argument("--case", nargs=2, metavar=("MODE", "CHAPTERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case[0], int(args.case[1]), args.chars)))
+        return
+
+    print(f"{'mode':<8} {'chapitres':>9} {'temps (s)':>10} {'RSS max (Mo)':>13} {'RSS workers':>12}")
+    for count in args.chapters:
+        for mode in args.modes:
+            output = subprocess.run(
+                [sys.executable, "-m", "bench.bench_course_pdf", "--chars", str(args.chars), "--case", mode, str(count)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<8} {count:>9} {result['seconds']:>10} {result['peak_rss_mb']:>13} {result['peak_worker_rss_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
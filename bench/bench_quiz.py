@@ -0,0 +1,44 @@
+import argparse
+import time
+
+from bench.mock_openai import start_server
+from engine import cache, llm, quiz
+from engine.metrics import metrics
+
+
+def run(label, func):
+    metrics.reset()
+    start = time.perf_counter()
+    text = func()
+    elapsed = time.perf_counter() - start
+    stage = metrics.snapshot()["stages"].get("quiz", {})
+    print(f"{label:<12} {elapsed:6.2f}s  {stage.get('count', 0):3d} appels  "
+          f"{stage.get('prompt_tokens', 0):6d} jetons de prompt  {stage.get('completion_tokens', 0):6d} jetons générés")
+    return text
+
+
+# Compare le quiz en une requête sur tout le chapitre et le quiz map-reduce
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de génération des quiz")
+    parser.add_argument("--pages", type=int, default=20, help="taille du chapitre (~3000 caractères par page)")
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=5000)
+    args = parser.parse_args()
+
+    server, base = start_server(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                                prefill_tokens_per_second=args.prefill_tokens_per_second)
+    llm.configure(api_key="sk-mock", base=base)
+    cache.ENABLED = False
+    paragraph = "Notion détaillée avec exemples, exercices et bonnes pratiques. " * 8
+    content = "\n\n".join(f"Section {i}\n{paragraph * 6}" for i in range(args.pages))
+
+    print(f"chapitre de {len(content)} caractères (~{quiz.count_tokens(content)} jetons), {args.questions} questions")
+    run("une requête", lambda: llm.chat(quiz.legacy_quiz_messages(content, args.questions), stage="quiz"))
+    run("map-reduce", lambda: quiz.generate_quiz(content, args.questions))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BODY = ("Paragraphe de contenu détaillé avec exemples et exercices. " * 8 + "\n\n") * 40
+
+
+def measure(app, toggle, reruns):
+    times = []
+    for attempt in range(reruns):
+        toggle(app, attempt)
+        start = time.perf_counter()
+        app.run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def api_rerun(size, reruns):
+    app = AppTest.from_file(os.path.join(ROOT, "api.py"), default_timeout=120)
+    app.run()
+    app.session_state["course_modules"] = [f"Module {number}: {BODY}" for number in range(1, size + 1)]
+    app.run()
+    return measure(app, lambda app, attempt: app.sidebar.selectbox[0].set_value(["English", "Français"][attempt % 2]), reruns)
+
+
+def app_rerun(size, reruns):
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    app.run()
+    app.session_state["course_plan"] = "\n".join(f"Chapitre {number}" for number in range(1, size + 1))
+    app.session_state["chapters"] = [(f"Chapitre {number}", BODY, "Question ? " * 200) for number in range(1, size + 1)]
+    app.session_state["download_link"] = b"%PDF" * 500000
+    app.run()
+    return measure(app, lambda app, attempt: app.sidebar.checkbox[0].set_value(attempt % 2 == 0), reruns)
+
+
+# Durée médiane d'une relance complète des apps Streamlit (bascule d'un
+# widget de la barre latérale) selon la taille du cours affiché
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du coût d'une relance Streamlit")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 15, 50])
+    parser.add_argument("--reruns", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+    os.environ.setdefault("EF2C_CHAPTERS_DIR", os.devnull)
+    sys.path.insert(0, ROOT)
+    print(f"{'taille':>6} {'api.py':>9} {'app.py':>9}")
+    for size in args.sizes:
+        print(f"{size:>6} {api_rerun(size, args.reruns) * 1000:>7.1f}ms {app_rerun(size, args.reruns) * 1000:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
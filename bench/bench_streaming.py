@@ -0,0 +1,50 @@
+import argparse
+import time
+
+from bench.fake_stream import fake_stream
+from engine import cache, llm
+from engine.course import stream_chapter_content
+
+
+# Mesure le délai avant premier affichage et la durée totale, en mode bloquant
+# (rendu après réception complète) et en mode flux (rendu fragment par fragment).
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du rendu en flux")
+    parser.add_argument("--chars", type=int, default=20000)
+    parser.add_argument("--first-token-delay", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--render-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    cache.ENABLED = False
+    text = ("Contenu simulé. " * (args.chars // 16 + 1))[:args.chars]
+    llm.stream_source = fake_stream(text, first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+
+    start = time.perf_counter()
+    full = "".join(stream_chapter_content("Chapitre 1"))
+    render = [full]
+    blocking_first = blocking_total = time.perf_counter() - start
+
+    start = time.perf_counter()
+    streaming_first = None
+    last_render = 0.0
+    parts = []
+    for delta in stream_chapter_content("Chapitre 1"):
+        parts.append(delta)
+        now = time.perf_counter() - start
+        if streaming_first is None:
+            streaming_first = now
+        if now - last_render >= args.render_interval:
+            render.append("".join(parts))
+            last_render = now
+    render.append("".join(parts))
+    streaming_total = time.perf_counter() - start
+
+    assert render[-1] == full
+    print(f"{args.chars} caractères")
+    print(f"bloquant : premier affichage {blocking_first:.2f}s, total {blocking_total:.2f}s")
+    print(f"flux     : premier affichage {streaming_first:.2f}s, total {streaming_total:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
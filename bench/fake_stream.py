@@ -0,0 +1,14 @@
+import time
+
+
+# Source de flux simulée à brancher sur engine.llm.stream_source : premier
+# fragment après first_token_delay, puis un fragment toutes les token_delay secondes.
+def fake_stream(text="Contenu simulé. " * 200, chunk_size=4, first_token_delay=0.5, token_delay=0.005):
+    def source(messages, model, **params):
+        time.sleep(first_token_delay)
+        for start in range(0, len(text), chunk_size):
+            if start:
+                time.sleep(token_delay)
+            yield text[start:start + chunk_size]
+
+    return source
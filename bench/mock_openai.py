@@ -0,0 +1,176 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER = "Contenu simulé avec exemples, exercices et bonnes pratiques. "
+
+
+# Serveur local imitant /v1/chat/completions pour mesurer sans réseau :
+# latence fixe avant le premier token, débit en tokens/s, réponses en flux
+# (SSE) et injection de 429 (quota par fenêtre et/ou taux aléatoire).
+class MockHandler(BaseHTTPRequestHandler):
+    latency = 0.5
+    tokens_per_second = 0
+    reply_chars = 3000
+    rate_limit = 0
+    rate_window = 1.0
+    error_rate = 0.0
+    prefill_tokens_per_second = 0
+    reply = None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        if self._rate_limited():
+            self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                            {"Retry-After": str(self.rate_window)})
+            return
+
+        prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+        content = self.reply if self.reply is not None else self._make_reply(prompt)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        model = body.get("model", "gpt-3.5-turbo")
+
+        time.sleep(self.latency)
+        if self.prefill_tokens_per_second:
+            time.sleep(usage["prompt_tokens"] / self.prefill_tokens_per_second)
+        if body.get("stream"):
+            self._stream(content, model)
+            return
+        if self.tokens_per_second:
+            time.sleep(usage["completion_tokens"] / self.tokens_per_second)
+        self._send_json(200, {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _make_reply(self, prompt):
+        match = re.search(r"Générez (\d+) questions à choix multiples portant", prompt)
+        if match:
+            # Candidats de quiz en JSON, propres à chaque extrait
+            seed = zlib.crc32(prompt.encode("utf-8")) % 10000
+            return json.dumps({"questions": [
+                {"question": f"Question {seed}-{i} sur la notion {seed * 31 + i} ?",
+                 "options": [f"Option {letter}" for letter in "ABCD"], "answer": "ABCD"[i % 4]}
+                for i in range(int(match.group(1)))
+            ]}, ensure_ascii=False)
+        match = re.search(r"No\. of Modules: (\d+)", prompt)
+        if match and prompt.startswith("You are Prompter"):
+            return f"You are Tabler. Write a course outline. No. of Modules: {match.group(1)}"
+        if match:
+            lines = ["Course Title: Mock course", "Course outcomes: mock"]
+            for i in range(1, int(match.group(1)) + 1):
+                lines += [f"Module {i}: Topic {i}"] + [f"Lesson {i}.{j}: Subtopic {i}.{j}" for j in range(1, 4)]
+            return "\n".join(lines)
+        match = re.search(r"Nombre de chapitres : (\d+)", prompt)
+        if match:
+            lines = ["Prérequis : aucun", "Objectif : maîtriser le sujet"]
+            lines += [f"Chapitre {i}: Sujet {i}\nDescription du chapitre {i}." for i in range(1, int(match.group(1)) + 1)]
+            return "\n".join(lines + ["Conclusion"])
+        return (FILLER * (self.reply_chars // len(FILLER) + 1))[:self.reply_chars]
+
+    def _rate_limited(self):
+        with self.lock:
+            if self.error_rate and self.random.random() < self.error_rate:
+                return True
+            if not self.rate_limit:
+                return False
+            now = time.monotonic()
+            while self.requests and now - self.requests[0] > self.rate_window:
+                self.requests.popleft()
+            if len(self.requests) >= self.rate_limit:
+                return True
+            self.requests.append(now)
+            return False
+
+    def _stream(self, content, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        chunk_size = 16
+        delay = (chunk_size / 4) / self.tokens_per_second if self.tokens_per_second else 0
+        for start in range(0, len(content), chunk_size):
+            event = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + chunk_size]}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            if delay:
+                time.sleep(delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0, latency=0.5, tokens_per_second=0, reply_chars=3000, rate_limit=0, rate_window=1.0,
+                 error_rate=0.0, seed=0, prefill_tokens_per_second=0):
+    handler = type("Handler", (MockHandler,), {
+        "latency": latency,
+        "tokens_per_second": tokens_per_second,
+        "reply_chars": reply_chars,
+        "rate_limit": rate_limit,
+        "rate_window": rate_window,
+        "error_rate": error_rate,
+        "prefill_tokens_per_second": prefill_tokens_per_second,
+        "lock": threading.Lock(),
+        "requests": deque(),
+        "random": random.Random(seed),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur OpenAI simulé")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--latency", type=float, default=0.5, help="secondes avant le premier token")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="débit de génération (0 = instantané)")
+    parser.add_argument("--reply-chars", type=int, default=3000)
+    parser.add_argument("--rate-limit", type=int, default=0, help="requêtes acceptées par fenêtre (0 = illimité)")
+    parser.add_argument("--rate-window", type=float, default=1.0, help="durée de la fenêtre en secondes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probabilité d'un 429 aléatoire")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=0, help="lecture du prompt (0 = instantanée)")
+    args = parser.parse_args()
+    server, base = start_server(args.port, args.latency, args.tokens_per_second, args.reply_chars,
+                                args.rate_limit, args.rate_window, args.error_rate,
+                                prefill_tokens_per_second=args.prefill_tokens_per_second)
+    print(f"Mock OpenAI sur {base} (OPENAI_API_BASE={base})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
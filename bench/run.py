@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.mock_openai import start_server
+
+SCENARIOS = ("app", "api")
+
+
+def run_app(args, directory):
+    from engine.course import generate_course_plan, generate_chapter_content, generate_quiz, extract_chapters
+    from engine.course_pdf import CoursePdfBuilder
+    from engine.pipeline import generate_chapters
+
+    plan = generate_course_plan("Benchmark", "2 jours", "Débutants", "Bases du sujet", args.chapters)
+    chapters = extract_chapters(plan)
+    header = "Titre : Benchmark\n\nListe des chapitres :\n" + "\n".join(chapters)
+    with CoursePdfBuilder(os.path.join(directory, "course.pdf"), "Benchmark", header) as course_pdf:
+        generate_chapters(
+            chapters, generate_chapter_content, generate_quiz,
+            max_in_flight=args.max_in_flight,
+            on_result=lambda index, result: course_pdf.add_chapter(index + 1, *result),
+        )
+
+
+def run_api(args, directory):
+    from engine.course import generate_module, generate_outline
+    from engine.outline import parse_modules
+    from engine.pdf import pdf_bytes
+    from engine.pipeline import run_ordered
+
+    outline = generate_outline("Benchmark", "Bachelors", "Beginner", args.modules, "6 weeks", "3",
+                               use_meta_prompt=bool(args.meta_prompt))
+    entries = parse_modules(outline) or [{"number": number, "text": None} for number in range(1, args.modules + 1)]
+    modules = run_ordered(
+        lambda entry: generate_module("Benchmark", entry["number"], module_outline=entry["text"]),
+        entries,
+        max_in_flight=args.max_in_flight,
+        retries=2,
+    )
+    for entry, module in zip(entries, modules):
+        pdf_bytes(f"Module {entry['number']}: {module}", ascii_only=True)
+
+
+# Exécuté dans un processus neuf : un scénario, ses métriques et son pic de RSS
+def run_scenario(args):
+    from engine import cache, llm, scheduler
+    from engine.metrics import metrics
+
+    cache.ENABLED = False
+    if args.scheduler_requests or args.scheduler_tokens:
+        scheduler.scheduler = scheduler.Scheduler(
+            args.scheduler_requests or 10 ** 9, args.scheduler_tokens or 10 ** 12, window=args.rate_window
+        )
+    else:
+        scheduler.ENABLED = False
+    metrics.keep_samples = 100000
+    llm.configure(api_key="sk-mock", base=args.api_base)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        {"app": run_app, "api": run_api}[args.scenario](args, directory)
+        seconds = time.perf_counter() - start
+
+    stages = {}
+    for stage, data in metrics.snapshot()["stages"].items():
+        stages[stage] = {
+            "count": data["count"],
+            "errors": data["errors"],
+            "retries": data["retries"],
+            "prompt_tokens": data["prompt_tokens"],
+            "completion_tokens": data["completion_tokens"],
+            "mean": data["seconds_sum"] / data["count"],
+            **metrics.percentiles(stage),
+        }
+    return {
+        "scenario": args.scenario,
+        "seconds": seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": stages,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(report):
+    for result in report["results"]:
+        print(f"\n[{result['scenario']}] {result['seconds']:.2f}s de bout en bout, RSS max {result['peak_rss_mb']:.1f} Mo")
+        print(f"  {'étape':<10} {'appels':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'retries':>7} {'erreurs':>7}")
+        for stage, data in sorted(result["stages"].items()):
+            print(f"  {stage:<10} {data['count']:>6} {data.get('p50', 0):>7.3f} {data.get('p95', 0):>7.3f} "
+                  f"{data.get('p99', 0):>7.3f} {data['retries']:>7} {data['errors']:>7}")
+
+
+# Compare à un rapport précédent : régression si une durée dépasse l'ancienne de
+# plus de threshold (en relatif) et de plus de min_delta secondes (bruit des petites valeurs)
+def compare(report, baseline, threshold, min_delta=0.05):
+    regressions = []
+    previous = {result["scenario"]: result for result in baseline["results"]}
+    print(f"\nComparaison avec {baseline['commit']} (seuil {threshold:.0%})")
+    for result in report["results"]:
+        old = previous.get(result["scenario"])
+        if not old:
+            continue
+        checks = [("total", result["seconds"], old["seconds"])]
+        for stage, data in sorted(result["stages"].items()):
+            if stage in old["stages"] and "p95" in data and "p95" in old["stages"][stage]:
+                checks.append((f"{stage} p95", data["p95"], old["stages"][stage]["p95"]))
+        for name, new_value, old_value in checks:
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            flag = "RÉGRESSION" if change > threshold and new_value - old_value > min_delta else ""
+            print(f"  {result['scenario']:<4} {name:<16} {old_value:>8.3f} -> {new_value:>8.3f} ({change:+.0%}) {flag}")
+            if flag:
+                regressions.append((result["scenario"], name))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de bout en bout hors ligne (mock OpenAI)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--chapters", type=int, default=15)
+    parser.add_argument("--modules", type=int, default=15)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=2000)
+    parser.add_argument("--reply-chars", type=int, default=6000)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--rate-window", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--scheduler-requests", type=float, default=0,
+                        help="budget de requêtes de l'ordonnanceur par fenêtre --rate-window (0 = désactivé)")
+    parser.add_argument("--scheduler-tokens", type=float, default=0,
+                        help="budget de tokens de l'ordonnanceur par fenêtre --rate-window (0 = illimité)")
+    parser.add_argument("--meta-prompt", type=int, default=0, help="1 = plan d'api.py via le méta-prompt Prompter")
+    parser.add_argument("--output", help="fichier JSON du rapport (défaut : bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="rapport JSON de référence")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--min-delta", type=float, default=0.05, help="écart minimal en secondes pour une régression")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--api-base", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(run_scenario(args)))
+        return
+
+    server, base = start_server(
+        latency=args.latency, tokens_per_second=args.tokens_per_second, reply_chars=args.reply_chars,
+        rate_limit=args.rate_limit, rate_window=args.rate_window, error_rate=args.error_rate,
+    )
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("output", "compare", "threshold", "min_delta", "scenario", "api_base", "scenarios")}
+    report = {"commit": git_commit(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": config, "results": []}
+    try:
+        for scenario in args.scenarios:
+            command = [sys.executable, "-m", "bench.run", "--scenario", scenario, "--api-base", base]
+            for key, value in config.items():
+                command += [f"--{key.replace('_', '-')}", str(value)]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            report["results"].append(json.loads(output.strip().splitlines()[-1]))
+    finally:
+        server.shutdown()
+
+    print_report(report)
+    output_path = args.output or os.path.join("bench", "results", f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nRapport écrit dans {output_path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["config"] != config:
+            print("Attention : configuration différente de la référence", file=sys.stderr)
+        if compare(report, baseline, args.threshold, args.min_delta):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
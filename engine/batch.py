@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from engine import llm
+from engine.course import generate_course_plan, generate_chapter_content, generate_quiz, extract_chapters
+from engine.course_pdf import CoursePdfBuilder
+from engine.pdf import pdf_bytes
+from engine.pipeline import generate_chapters
+from engine.scheduler import current_session
+
+REQUIRED_FIELDS = ("title", "duration", "audience", "objectives", "num_chapters")
+
+
+def course_slug(spec):
+    return str(spec.get("id") or spec["title"]).replace(' ', '_').replace('/', '_')
+
+
+def load_specs(path):
+    specs = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            spec = json.loads(line)
+            missing = [field for field in REQUIRED_FIELDS if field not in spec]
+            if missing:
+                raise ValueError(f"{path}:{number}: champs manquants : {', '.join(missing)}")
+            specs.append(spec)
+    return specs
+
+
+# Point de reprise d'un cours : plan et chapitres terminés, écrit de façon atomique
+class Checkpoint:
+    def __init__(self, path, spec):
+        self.path = path
+        self.state = {"spec": spec, "plan": None, "chapters": {}, "done": False}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+# Limite globale d'appels LLM simultanés, partagée par tous les cours du lot
+def limited(func, semaphore):
+    def call(*args, **kwargs):
+        with semaphore:
+            return func(*args, **kwargs)
+
+    return call
+
+
+# Génère plan, chapitres, quiz et PDF d'un cours en reprenant le travail déjà fait
+def run_course(spec, output_dir, semaphore, max_in_flight):
+    slug = course_slug(spec)
+    current_session.set(slug)
+    checkpoint = Checkpoint(os.path.join(output_dir, ".checkpoints", f"{slug}.json"), spec)
+    state = checkpoint.state
+    if state["done"]:
+        return slug, "déjà terminé"
+
+    if state["plan"] is None:
+        state["plan"] = limited(generate_course_plan, semaphore)(
+            spec["title"], spec["duration"], spec["audience"], spec["objectives"], spec["num_chapters"]
+        )
+        checkpoint.save()
+
+    chapters = extract_chapters(state["plan"])
+    todo = [(index, chapter_title) for index, chapter_title in enumerate(chapters, 1) if str(index) not in state["chapters"]]
+
+    def on_chapter_done(position, result):
+        if isinstance(result, Exception):
+            return
+        chapter_title, chapter_content, quiz_content = result
+        state["chapters"][str(todo[position][0])] = {"title": chapter_title, "content": chapter_content, "quiz": quiz_content}
+        checkpoint.save()
+
+    # Les chapitres réussis sont enregistrés même si d'autres échouent
+    results = generate_chapters(
+        [chapter_title for _, chapter_title in todo],
+        limited(generate_chapter_content, semaphore),
+        # chaque appel du quiz prend sa place dans la limite globale
+        lambda chapter_content: generate_quiz(chapter_content, call=limited(llm.chat, semaphore)),
+        max_in_flight=max_in_flight,
+        on_result=on_chapter_done,
+        retries=1,
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        raise errors[0]
+
+    plan_path = os.path.join(output_dir, "plan", f"plan_{slug}.pdf")
+    os.makedirs(os.path.dirname(plan_path), exist_ok=True)
+    with open(plan_path, "wb") as pdf:
+        pdf.write(pdf_bytes(state["plan"]))
+
+    header = f"Titre : {spec['title']}\nDurée : {spec['duration']}\nObjectifs : {spec['objectives']}\n\nListe des chapitres :\n" + "\n".join(chapters)
+    with CoursePdfBuilder(os.path.join(output_dir, "chapitres", f"{slug}.pdf"), spec["title"], header) as course_pdf:
+        for index in range(1, len(chapters) + 1):
+            chapter = state["chapters"][str(index)]
+            course_pdf.add_chapter(index, chapter["title"], chapter["content"], chapter["quiz"])
+
+    state["done"] = True
+    checkpoint.save()
+    return slug, f"{len(chapters)} chapitres ({len(todo)} générés)"
+
+
+def run_batch(specs, output_dir="cours", concurrency=8, parallel_courses=4, max_in_flight=4):
+    semaphore = threading.BoundedSemaphore(concurrency)
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(1, parallel_courses)) as executor:
+        futures = {executor.submit(run_course, spec, output_dir, semaphore, max_in_flight): spec for spec in specs}
+        for future in as_completed(futures):
+            spec = futures[future]
+            try:
+                slug, status = future.result()
+                print(f"[ok] {slug} : {status}")
+            except Exception as e:
+                failures.append(spec)
+                print(f"[échec] {course_slug(spec)} : {e}", file=sys.stderr)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génération de cours par lot à partir d'un fichier JSONL")
+    parser.add_argument("specs", help="fichier JSONL : title, duration, audience, objectives, num_chapters")
+    parser.add_argument("--output", default="cours", help="dossier de sortie (plan/ et chapitres/)")
+    parser.add_argument("--concurrency", type=int, default=8, help="appels LLM simultanés pour tout le lot")
+    parser.add_argument("--courses", type=int, default=4, help="cours traités en parallèle")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="chapitres en parallèle par cours")
+    args = parser.parse_args()
+
+    load_dotenv()
+    llm.configure(api_key=os.getenv("OPENAI_API_KEY"))
+    specs = load_specs(args.specs)
+    start = time.perf_counter()
+    failures = run_batch(specs, args.output, args.concurrency, args.courses, args.max_in_flight)
+    print(f"{len(specs) - len(failures)}/{len(specs)} cours en {time.perf_counter() - start:.1f}s")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
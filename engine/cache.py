@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_PATH = os.getenv("EF2C_CACHE_PATH", ".cache/llm_cache.sqlite")
+MEMORY_ENTRIES = int(os.getenv("EF2C_CACHE_MEMORY_ENTRIES", "256"))
+DISK_ENTRIES = int(os.getenv("EF2C_CACHE_DISK_ENTRIES", "5000"))
+TTL = float(os.getenv("EF2C_CACHE_TTL", str(7 * 24 * 3600)))
+ENABLED = os.getenv("EF2C_CACHE", "1") != "0"
+
+
+# Clé de cache : empreinte de (modèle, messages, paramètres)
+def make_key(model, messages, params):
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Cache à deux niveaux : LRU en mémoire devant une table SQLite sur disque,
+# avec expiration (ttl) et limite du nombre d'entrées sur chaque niveau.
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES, ttl=TTL):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.connection = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+    def _db(self):
+        if self.connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        return self.connection
+
+    def _expired(self, created, now):
+        return self.ttl and now - created > self.ttl
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created, now):
+                    self.memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self.memory[key]
+            if self.path:
+                db = self._db()
+                row = db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, created = row
+                    if not self._expired(created, now):
+                        db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        db.commit()
+                        self._remember(key, value, created)
+                        self.counters["disk_hits"] += 1
+                        return value
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    db.commit()
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key, value):
+        now = time.time()
+        with self.lock:
+            self._remember(key, value, now)
+            self.counters["writes"] += 1
+            if self.path:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                self._evict(db, now)
+                db.commit()
+
+    def _remember(self, key, value, created):
+        self.memory[key] = (value, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _evict(self, db, now):
+        if self.ttl:
+            db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        (count,) = db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.disk_entries:
+            db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (count - self.disk_entries,),
+            )
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.path:
+                db = self._db()
+                db.execute("DELETE FROM responses")
+                db.commit()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self.memory)
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+            return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Cache partagé par tout le processus (app.py, api.py, scripts)
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,57 @@
+import os
+import time
+
+import requests
+
+# Durée maximale d'attente d'un travail, en secondes
+WAIT_TIMEOUT = float(os.getenv("EF2C_BACKEND_WAIT_TIMEOUT", "1800"))
+
+
+# Client léger du backend (backend.py) : soumet un travail et attend le résultat.
+# Le jeton partagé (EF2C_BACKEND_TOKEN) est envoyé avec chaque requête.
+class BackendClient:
+    def __init__(self, base_url, poll_interval=1.0, timeout=30, token=None, wait_timeout=WAIT_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.wait_timeout = wait_timeout
+        self.headers = {"X-EF2C-Token": token or os.getenv("EF2C_BACKEND_TOKEN", "")}
+
+    def _get(self, path):
+        response = requests.get(f"{self.base_url}{path}", headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def submit(self, kind, params):
+        response = requests.post(
+            f"{self.base_url}/jobs", json={"kind": kind, "params": params}, headers=self.headers, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def status(self, job_id):
+        return self._get(f"/jobs/{job_id}").json()
+
+    # Attend la fin du travail ; on_progress(done, total) à chaque changement.
+    # TimeoutError si le travail n'est pas terminé après wait_timeout secondes.
+    def wait(self, job_id, on_progress=None):
+        last = None
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            status = self.status(job_id)
+            if on_progress and (status["done"], status["total"]) != last:
+                last = (status["done"], status["total"])
+                on_progress(*last)
+            if status["status"] == "failed":
+                raise RuntimeError(status["error"])
+            if status["status"] == "done":
+                return self._get(f"/jobs/{job_id}/result").json()
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Travail {job_id} non terminé après {self.wait_timeout:.0f}s")
+            time.sleep(self.poll_interval)
+
+    def run(self, kind, params, on_progress=None):
+        return self.wait(self.submit(kind, params), on_progress)
+
+    def pdf(self, job_id):
+        return self._get(f"/jobs/{job_id}/pdf").content
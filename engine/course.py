@@ -0,0 +1,126 @@
+import os
+import threading
+from collections import OrderedDict
+
+from engine import llm, quiz
+from prompts.tabler_prompt import TABLER_PROMPT
+
+# Plan d'api.py : par défaut la requête Tabler est construite localement ; le
+# méta-prompt « Prompter » (un aller-retour de plus) reste disponible sur demande
+META_PROMPT = os.getenv("EF2C_META_PROMPT", "0") == "1"
+META_PROMPT_ENTRIES = 256
+
+
+# Fonction pour construire la requête du plan du cours
+def course_plan_messages(title, duration, audience, objectives, num_chapters):
+    prompt = f"""
+    Crée un plan complet et très détaillé pour une formation intitulée "{title}".
+
+    Détails :
+    - Durée : {duration}
+    - Public concerné : {audience}
+    - Contenu de la formation : {objectives}
+    - Nombre de chapitres : {num_chapters}
+
+    Le plan doit inclure :
+    1. Les prérequis nécessaires pour suivre cette formation.
+    2. L'objectif final de la formation (reprenant les objectifs indiqués).
+    3. Une liste des chapitres avec :
+       - Un titre pour chaque chapitre.
+       - Une description très détaillée pour chaque chapitre (6 à 8 lignes).
+       - Une énumération des sous-chapitres avec leurs titres et une brève explication.
+    4. Une conclusion résumant les points clés de la formation et comment les objectifs seront atteints.
+    """
+    return [{"role": "user", "content": prompt}]
+
+# Fonction pour construire la requête du contenu détaillé d’un chapitre
+def chapter_messages(chapter_title):
+    prompt = f"""
+    Crée un contenu extrêmement détaillé et structuré pour le chapitre : "{chapter_title}".
+    
+    Le contenu doit inclure environ 15 à 25 pages, détaillé et structuré avec exemples, cas pratiques, exercices, et bonnes pratiques.
+    """
+    return [{"role": "user", "content": prompt}]
+
+# Entrées du formulaire d'api.py, espaces normalisés
+def outline_inputs(course_name, audience, difficulty, num_modules, duration, credit):
+    return tuple(" ".join(str(value).split()) for value in (course_name, audience, difficulty, num_modules, duration, credit))
+
+def outline_request(inputs):
+    course_name, audience, difficulty, num_modules, duration, credit = inputs
+    return f"Course Name: {course_name}\nTarget Audience Edu Level: {audience}\nCourse Difficulty Level: {difficulty}\nNo. of Modules: {num_modules}\nCourse Duration: {duration}\nCourse Credit: {credit}"
+
+def prompter_messages(inputs):
+    course_name, audience, difficulty, num_modules, duration, credit = inputs
+    prompt = f"You are Prompter. Generate a detailed prompt for Tabler using these inputs: 1) Course Name: {course_name} 2) Target Audience Edu Level: {audience} 3) Course Difficulty Level: {difficulty} 4) No. of Modules: {num_modules} 5) Course Duration: {duration} 6) Course Credit: {credit}."
+    return [{"role": "system", "content": prompt}]
+
+_meta_prompts = OrderedDict()
+_meta_prompts_lock = threading.Lock()
+
+# Méta-prompt mémoïsé par entrées normalisées (casse comprise) et modèle
+def meta_prompt(inputs, model=llm.DEFAULT_MODEL):
+    key = (tuple(value.casefold() for value in inputs), model)
+    with _meta_prompts_lock:
+        if key in _meta_prompts:
+            _meta_prompts.move_to_end(key)
+            return _meta_prompts[key]
+    prompt = llm.chat(prompter_messages(inputs), model=model, stage="prompter")
+    with _meta_prompts_lock:
+        _meta_prompts[key] = prompt
+        while len(_meta_prompts) > META_PROMPT_ENTRIES:
+            _meta_prompts.popitem(last=False)
+    return prompt
+
+# Fonction pour construire la requête du plan de cours d'api.py (Tabler)
+def outline_messages(course_name, audience, difficulty, num_modules, duration, credit, model=llm.DEFAULT_MODEL, use_meta_prompt=META_PROMPT):
+    inputs = outline_inputs(course_name, audience, difficulty, num_modules, duration, credit)
+    if use_meta_prompt:
+        return [{"role": "system", "content": meta_prompt(inputs, model)}]
+    return [{"role": "system", "content": TABLER_PROMPT}, {"role": "user", "content": outline_request(inputs)}]
+
+# Fonction pour construire la requête d'un module du cours (api.py)
+def module_messages(course_name, module_number, module_outline=None):
+    module_prompt = f"Generate detailed content for Module {module_number} of the course: {course_name}. The module should include an introduction, main content, examples, and a summary."
+    if module_outline:
+        module_prompt += f" Follow this module outline and cover every lesson it lists:\n{module_outline}"
+    return [{"role": "system", "content": module_prompt}]
+
+# Fonction pour générer le plan du cours
+def generate_course_plan(title, duration, audience, objectives, num_chapters):
+    return llm.chat(course_plan_messages(title, duration, audience, objectives, num_chapters), stage="plan")
+
+# Fonction pour générer le contenu détaillé d’un chapitre
+def generate_chapter_content(chapter_title):
+    return llm.chat(chapter_messages(chapter_title), stage="chapter")
+
+# Fonction pour générer un quiz (map-reduce borné en jetons, voir engine/quiz.py)
+def generate_quiz(chapter_content, num_questions=5, max_in_flight=quiz.MAX_IN_FLIGHT, call=llm.chat):
+    return quiz.generate_quiz(chapter_content, num_questions, max_in_flight=max_in_flight, call=call)
+
+# Fonction pour générer le plan de cours d'api.py
+def generate_outline(course_name, audience, difficulty, num_modules, duration, credit, model=llm.DEFAULT_MODEL, use_meta_prompt=META_PROMPT):
+    messages = outline_messages(course_name, audience, difficulty, num_modules, duration, credit, model, use_meta_prompt)
+    return llm.chat(messages, model=model, stage="tabler")
+
+# Fonction pour générer un module du cours (api.py)
+def generate_module(course_name, module_number, model=llm.DEFAULT_MODEL, module_outline=None):
+    return llm.chat(module_messages(course_name, module_number, module_outline), model=model, stage="module")
+
+# Variantes en flux : renvoient un itérateur de fragments de texte
+def stream_course_plan(title, duration, audience, objectives, num_chapters):
+    return llm.stream_chat(course_plan_messages(title, duration, audience, objectives, num_chapters), stage="plan")
+
+def stream_chapter_content(chapter_title):
+    return llm.stream_chat(chapter_messages(chapter_title), stage="chapter")
+
+def stream_outline(course_name, audience, difficulty, num_modules, duration, credit, model=llm.DEFAULT_MODEL, use_meta_prompt=META_PROMPT):
+    messages = outline_messages(course_name, audience, difficulty, num_modules, duration, credit, model, use_meta_prompt)
+    return llm.stream_chat(messages, model=model, stage="tabler")
+
+def stream_module(course_name, module_number, model=llm.DEFAULT_MODEL, module_outline=None):
+    return llm.stream_chat(module_messages(course_name, module_number, module_outline), model=model, stage="module")
+
+# Fonction pour extraire les titres de chapitres du plan
+def extract_chapters(course_plan):
+    return [line.strip() for line in course_plan.splitlines() if line.strip().startswith("Chapitre")]
@@ -0,0 +1,198 @@
+import atexit
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from fpdf import FPDF
+from PyPDF2 import PdfMerger
+
+from engine.metrics import timed
+from engine.pdf import FONT_PATH
+
+# Au-delà d'un cœur, les chapitres sont rendus en parallèle dans des segments ;
+# sinon un seul document est construit (police enregistrée une seule fois)
+PDF_WORKERS = int(os.getenv("EF2C_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Segments rendus conservés sur disque par empreinte : un chapitre inchangé
+# n'est pas re-rendu lors d'une régénération partielle ("" pour désactiver)
+SEGMENT_CACHE_PATH = os.getenv("EF2C_PDF_SEGMENT_CACHE", os.path.join(".cache", "pdf_segments"))
+SEGMENT_CACHE_ENTRIES = int(os.getenv("EF2C_PDF_SEGMENT_ENTRIES", "500"))
+
+TITLE_SIZE = 20
+HEADING_SIZE = 16
+SUBHEADING_SIZE = 14
+TEXT_SIZE = 12
+
+
+def new_document():
+    pdf = FPDF()
+    pdf.add_font('DejaVu', '', FONT_PATH)
+    return pdf
+
+
+# Ajoute une section sur une nouvelle page ; blocks est une liste de (taille, texte)
+def render_blocks(pdf, blocks, bookmark=None):
+    pdf.add_page()
+    if bookmark:
+        pdf.start_section(bookmark)
+    for size, text in blocks:
+        pdf.set_font('DejaVu', size=size)
+        pdf.multi_cell(0, size * 0.6 if size > TEXT_SIZE else 10, text)
+        pdf.ln(4 if size > TEXT_SIZE else 2)
+
+
+# Rend un segment (page de titre ou chapitre) dans son propre fichier PDF
+def render_segment(path, blocks):
+    pdf = new_document()
+    render_blocks(pdf, blocks)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    pdf.output(temporary)
+    os.replace(temporary, path)
+    return path
+
+
+def segment_key(blocks):
+    digest = hashlib.sha256()
+    for size, text in blocks:
+        digest.update(f"{size}\x1f{text}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Ne garde que les segments les plus récemment utilisés
+def prune_segments(directory=SEGMENT_CACHE_PATH, max_entries=SEGMENT_CACHE_ENTRIES):
+    try:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".pdf")]
+    except FileNotFoundError:
+        return
+    paths.sort(key=lambda path: os.path.getmtime(path), reverse=True)
+    for path in paths[max_entries:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def chapter_blocks(chapter_title, chapter_content, quiz_content):
+    return [
+        (HEADING_SIZE, chapter_title),
+        (TEXT_SIZE, chapter_content),
+        (SUBHEADING_SIZE, "Quiz"),
+        (TEXT_SIZE, quiz_content),
+    ]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Pool de processus partagé, créé à la première utilisation ("spawn" pour
+# rester sûr dans un serveur multi-thread comme Streamlit)
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None and PDF_WORKERS > 1:
+            _pool = ProcessPoolExecutor(PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+# Construit le PDF d'un cours chapitre par chapitre, sans jamais concaténer le
+# contenu complet. Avec un pool de processus, chaque chapitre est rendu dès son
+# ajout dans un segment sur disque et close() fusionne les segments dans l'ordre
+# avec un signet par chapitre. Sans pool, les chapitres sont écrits au fil de
+# l'eau dans un document unique ; ceux arrivés en avance attendent leur tour.
+class CoursePdfBuilder:
+    def __init__(self, output_path, title, header, pool=None):
+        self.output_path = output_path
+        self.pool = get_pool() if pool is None else pool
+        self.segments = {}
+        self.pending = {}
+        self.next_index = 1
+        if self.pool and SEGMENT_CACHE_PATH:
+            self.directory = None
+            os.makedirs(SEGMENT_CACHE_PATH, exist_ok=True)
+            self._submit(0, title, [(TITLE_SIZE, title), (TEXT_SIZE, header)])
+        elif self.pool:
+            self.directory = tempfile.mkdtemp(prefix="ef2c_pdf_")
+            self._submit(0, title, [(TITLE_SIZE, title), (TEXT_SIZE, header)])
+        else:
+            self.directory = None
+            self.document = new_document()
+            render_blocks(self.document, [(TITLE_SIZE, title), (TEXT_SIZE, header)], bookmark=title)
+
+    def _submit(self, index, bookmark, blocks):
+        if self.directory:
+            path = os.path.join(self.directory, f"{index:05d}.pdf")
+        else:
+            path = os.path.join(SEGMENT_CACHE_PATH, f"{segment_key(blocks)}.pdf")
+            if os.path.exists(path):
+                os.utime(path)
+                segment = Future()
+                segment.set_result(path)
+                self.segments[index] = (bookmark, segment)
+                return
+        self.segments[index] = (bookmark, self.pool.submit(render_segment, path, blocks))
+
+    # index commence à 1 ; les chapitres peuvent arriver dans le désordre
+    def add_chapter(self, index, chapter_title, chapter_content, quiz_content):
+        blocks = chapter_blocks(chapter_title, chapter_content, quiz_content)
+        if self.pool:
+            self._submit(index, chapter_title, blocks)
+            return
+        self.pending[index] = (chapter_title, blocks)
+        while self.next_index in self.pending:
+            bookmark, blocks = self.pending.pop(self.next_index)
+            render_blocks(self.document, blocks, bookmark=bookmark)
+            self.next_index += 1
+
+    def close(self):
+        with timed("pdf"):
+            return self._close()
+
+    def _close(self):
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not self.pool:
+            for index in sorted(self.pending):
+                bookmark, blocks = self.pending.pop(index)
+                render_blocks(self.document, blocks, bookmark=bookmark)
+            self.document.output(self.output_path)
+            return self.output_path
+        try:
+            merger = PdfMerger()
+            for index in sorted(self.segments):
+                bookmark, segment = self.segments[index]
+                merger.append(segment.result(), outline_item=bookmark)
+            merger.write(self.output_path)
+            merger.close()
+        finally:
+            if self.directory:
+                shutil.rmtree(self.directory, ignore_errors=True)
+            else:
+                prune_segments()
+        return self.output_path
+
+    def discard(self):
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+# Fonction pour générer le PDF complet d'un cours à partir de (titre, contenu, quiz)
+def build_course_pdf(output_path, title, header, chapters, pool=None):
+    with CoursePdfBuilder(output_path, title, header, pool=pool) as builder:
+        for index, (chapter_title, chapter_content, quiz_content) in enumerate(chapters, 1):
+            builder.add_chapter(index, chapter_title, chapter_content, quiz_content)
+    return output_path
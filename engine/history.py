@@ -0,0 +1,124 @@
+import argparse
+import dbm
+import os
+import shelve
+import sqlite3
+import threading
+import time
+
+from engine.metrics import timed
+
+HISTORY_PATH = os.getenv("EF2C_HISTORY_PATH", "chat_history.sqlite")
+SHELVE_PATH = "chat_history"
+DEFAULT_SESSION = "default"
+PAGE_SIZE = int(os.getenv("EF2C_HISTORY_PAGE", "50"))
+
+
+# Historique des conversations en journal d'ajout : une ligne par message,
+# indexée par session. SQLite en mode WAL permet des lectures concurrentes
+# pendant qu'une autre session écrit.
+class HistoryStore:
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session TEXT NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages (session, id)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.commit()
+
+    def append(self, session, messages):
+        if not messages:
+            return
+        now = time.time()
+        rows = [(session, m["role"], m["content"], now) for m in messages]
+        with timed("history"), self.lock:
+            self.connection.executemany(
+                "INSERT INTO messages (session, role, content, created) VALUES (?, ?, ?, ?)", rows
+            )
+            self.connection.commit()
+
+    # Renvoie les `limit` messages les plus récents (avant l'id `before` si donné),
+    # dans l'ordre chronologique. limit=None charge tout l'historique.
+    def load(self, session, limit=PAGE_SIZE, before=None):
+        query = "SELECT id, role, content FROM messages WHERE session = ?"
+        args = [session]
+        if before is not None:
+            query += " AND id < ?"
+            args.append(before)
+        query += " ORDER BY id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            args.append(limit)
+        with timed("history"), self.lock:
+            rows = self.connection.execute(query, args).fetchall()
+        return [{"id": id, "role": role, "content": content} for id, role, content in reversed(rows)]
+
+    def count(self, session):
+        with self.lock:
+            (count,) = self.connection.execute(
+                "SELECT COUNT(*) FROM messages WHERE session = ?", (session,)
+            ).fetchone()
+        return count
+
+    def clear(self, session):
+        with self.lock:
+            self.connection.execute("DELETE FROM messages WHERE session = ?", (session,))
+            self.connection.commit()
+
+    # Importe une seule fois l'ancien shelve (chat_history.dat/.dir/.bak). La
+    # clé meta est réservée dans la même transaction que l'import : si deux
+    # processus ouvrent l'historique ensemble, un seul importe les messages.
+    def migrate_shelve(self, shelve_path=SHELVE_PATH, session=DEFAULT_SESSION):
+        key = f"migrated:{os.path.abspath(shelve_path)}"
+        with self.lock:
+            if self.connection.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return 0
+        if not dbm.whichdb(shelve_path):
+            return 0
+        with shelve.open(shelve_path, flag="r") as db:
+            messages = db.get("messages", [])
+        with self.lock:
+            try:
+                self.connection.execute("BEGIN IMMEDIATE")
+                claimed = self.connection.execute(
+                    "INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)", (key, str(len(messages)))
+                ).rowcount
+                if claimed:
+                    self.connection.executemany(
+                        "INSERT INTO messages (session, role, content, created) VALUES (?, ?, ?, ?)",
+                        [(session, m["role"], m["content"], time.time()) for m in messages],
+                    )
+                self.connection.commit()
+            except BaseException:
+                self.connection.rollback()
+                raise
+        return len(messages) if claimed else 0
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+            _store.migrate_shelve()
+        return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migration de l'historique shelve vers SQLite")
+    parser.add_argument("shelve_path", nargs="?", default=SHELVE_PATH)
+    parser.add_argument("--db", default=HISTORY_PATH)
+    parser.add_argument("--session", default=DEFAULT_SESSION)
+    args = parser.parse_args()
+    count = HistoryStore(args.db).migrate_shelve(args.shelve_path, args.session)
+    print(f"{count} messages importés dans {args.db}")
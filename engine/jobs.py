@@ -0,0 +1,209 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from engine.course import (
+    generate_course_plan, generate_chapter_content, generate_quiz, extract_chapters, generate_module, generate_outline, META_PROMPT,
+)
+from engine.course_pdf import CoursePdfBuilder
+from engine.pdf import pdf_bytes
+from engine.pipeline import generate_chapters, run_ordered, MAX_IN_FLIGHT
+from engine.scheduler import current_session
+
+JOB_WORKERS = int(os.getenv("EF2C_JOB_WORKERS", "4"))
+JOB_TTL = float(os.getenv("EF2C_JOB_TTL", "3600"))
+
+
+# Une génération soumise au backend. Les événements (progression, fin) sont
+# conservés pour être relus par le polling ou le flux SSE.
+class Job:
+    def __init__(self, kind, params):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.pdf = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.events = []
+        self.condition = threading.Condition()
+
+    def publish(self, **event):
+        with self.condition:
+            self.events.append(dict(event, status=self.status, done=self.done, total=self.total))
+            self.condition.notify_all()
+
+    def progress(self, done, total):
+        self.done, self.total = done, total
+        self.publish(type="progress")
+
+    # Bloque jusqu'à ce qu'il y ait des événements après cursor (ou timeout)
+    def wait_events(self, cursor, timeout=15):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.events) > cursor, timeout=timeout)
+            return self.events[cursor:]
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "has_pdf": self.pdf is not None,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+def run_plan(params, job):
+    plan = generate_course_plan(params["title"], params["duration"], params["audience"], params["objectives"], params["num_chapters"])
+    return {"plan": plan, "chapters": extract_chapters(plan)}
+
+
+# Chapitres + quiz en parallèle ; avec params["pdf"] = {"title", "header"}
+# le PDF complet est construit au fil des chapitres
+def run_chapters(params, job):
+    titles = params.get("titles") or extract_chapters(params["plan"])
+    pdf_options = params.get("pdf")
+    course_pdf = None
+    if pdf_options:
+        path = os.path.join(tempfile.mkdtemp(prefix="ef2c_job_"), "course.pdf")
+        course_pdf = CoursePdfBuilder(path, pdf_options["title"], pdf_options["header"])
+    completed = []
+    job.progress(0, len(titles))
+
+    def on_chapter_done(index, result):
+        completed.append(index)
+        if course_pdf:
+            course_pdf.add_chapter(index + 1, *result)
+        job.progress(len(completed), len(titles))
+
+    try:
+        chapters = generate_chapters(titles, generate_chapter_content, generate_quiz, on_result=on_chapter_done)
+    except Exception:
+        if course_pdf:
+            course_pdf.discard()
+        raise
+    if course_pdf:
+        course_pdf.close()
+        with open(course_pdf.output_path, "rb") as pdf:
+            job.pdf = pdf.read()
+        os.remove(course_pdf.output_path)
+    return {"chapters": [list(chapter) for chapter in chapters]}
+
+
+def run_chapter(params, job):
+    return {"content": generate_chapter_content(params["title"])}
+
+
+def run_quiz(params, job):
+    return {"quiz": generate_quiz(params["content"], params.get("num_questions", 5))}
+
+
+# Plan par modules d'api.py
+def run_outline(params, job):
+    outline = generate_outline(
+        params["course_name"], params["audience"], params["difficulty"], params["num_modules"],
+        params["duration"], params["credit"], params.get("model", "gpt-3.5-turbo"),
+        params.get("use_meta_prompt", META_PROMPT),
+    )
+    return {"outline": outline}
+
+
+def run_modules(params, job):
+    numbers = params.get("numbers") or list(range(1, params["num_modules"] + 1))
+    outlines = params.get("outlines") or {}
+    completed = []
+    job.progress(0, len(numbers))
+
+    def on_module_done(index, result):
+        completed.append(index)
+        job.progress(len(completed), len(numbers))
+
+    modules = run_ordered(
+        lambda number: generate_module(params["course_name"], number, params.get("model", "gpt-3.5-turbo"), outlines.get(str(number))),
+        numbers,
+        max_in_flight=MAX_IN_FLIGHT,
+        on_result=on_module_done,
+        retries=2,
+        return_exceptions=True,
+    )
+    return {
+        "modules": {str(number): module for number, module in zip(numbers, modules) if not isinstance(module, Exception)},
+        "failed": [number for number, module in zip(numbers, modules) if isinstance(module, Exception)],
+    }
+
+
+def run_pdf(params, job):
+    job.pdf = pdf_bytes(params["content"], params.get("ascii_only", False))
+    return {"bytes": len(job.pdf)}
+
+
+HANDLERS = {
+    "plan": run_plan,
+    "chapters": run_chapters,
+    "chapter": run_chapter,
+    "quiz": run_quiz,
+    "outline": run_outline,
+    "modules": run_modules,
+    "pdf": run_pdf,
+}
+
+
+# File de travaux exécutés par un pool de threads, indépendante de l'interface
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, ttl=JOB_TTL):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ef2c-job")
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, kind, params):
+        if kind not in HANDLERS:
+            raise ValueError(f"Type de travail inconnu : {kind}")
+        job = Job(kind, params)
+        with self.lock:
+            self._evict()
+            self.jobs[job.id] = job
+        job.publish(type="queued")
+        self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job):
+        # un client peut regrouper ses travaux sous une même session (params["session"])
+        current_session.set(job.params.get("session") or job.id)
+        job.status = "running"
+        job.publish(type="started")
+        try:
+            job.result = HANDLERS[job.kind](job.params, job)
+            job.status = "done"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+        job.finished = time.time()
+        job.publish(type=job.status)
+
+    def _evict(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished and now - job.finished > self.ttl]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def stats(self):
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "done", "failed")}
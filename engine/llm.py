@@ -0,0 +1,180 @@
+import os
+import random
+import time
+
+import openai
+
+from engine import cache, scheduler
+from engine.metrics import metrics, timed
+
+# tiktoken est optionnel : sans lui, on compte ~4 caractères par jeton
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+# Erreurs transitoires pour lesquelles l'appel est relancé avec backoff
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+)
+
+MAX_RETRIES = int(os.getenv("EF2C_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("EF2C_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = 30.0
+
+# Permet de pointer vers un serveur local (mock) pour mesurer sans réseau
+api_base = os.getenv("OPENAI_API_BASE")
+
+
+metrics.register_gauges("ef2c_llm_cache", lambda: cache.get_cache().stats())
+
+_encodings = {}
+
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("cl100k_base")
+    return len(_encodings[model].encode(text))
+
+
+def configure(api_key=None, base=None):
+    global api_base
+    if api_key:
+        openai.api_key = api_key
+    if base:
+        api_base = base
+
+
+def backoff_delay(attempt, error=None):
+    headers = getattr(error, "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, float(retry_after))
+        except ValueError:
+            pass
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)
+
+
+# Appel ChatCompletion mis en cache, avec relance exponentielle sur les
+# limites de débit. use_cache=False force un nouvel appel pour cette requête ;
+# stage étiquette la mesure (plan, chapter, quiz, module...).
+def chat(messages, model=DEFAULT_MODEL, use_cache=True, stage="llm", **params):
+    with timed(stage) as sample:
+        use_cache = use_cache and cache.ENABLED
+        if use_cache:
+            key = cache.make_key(model, messages, params)
+            cached = cache.get_cache().get(key)
+            if cached is not None:
+                sample["cache_hit"] = True
+                return cached
+        content = _create(messages, model, sample, stage, **params)
+        if use_cache:
+            cache.get_cache().set(key, content)
+        return content
+
+
+# Source de flux remplaçable (ex. bench/fake_stream.py) pour mesurer le rendu hors ligne
+stream_source = None
+
+
+# Variante en flux de chat() : produit les fragments de texte au fil de l'eau.
+# Le texte complet est mis en cache à la fin ; un hit est renvoyé d'un bloc.
+def stream_chat(messages, model=DEFAULT_MODEL, use_cache=True, stage="llm", **params):
+    with timed(stage) as sample:
+        use_cache = use_cache and cache.ENABLED
+        if use_cache:
+            key = cache.make_key(model, messages, params)
+            cached = cache.get_cache().get(key)
+            if cached is not None:
+                sample["cache_hit"] = True
+                yield cached
+                return
+        parts = []
+        for delta in _stream(messages, model, sample, stage, **params):
+            parts.append(delta)
+            yield delta
+        if use_cache:
+            cache.get_cache().set(key, "".join(parts))
+
+
+# Chaque tentative passe par l'ordonnanceur du processus ; après un 429 la pause
+# est commune à toutes les sessions au lieu d'un sleep propre à cet appel.
+def _with_retries(call, sample, stage, estimated):
+    attempt = 0
+    while True:
+        scheduler.acquire(stage, estimated)
+        try:
+            return call()
+        except RETRYABLE_ERRORS as e:
+            scheduler.release(estimated)
+            if attempt >= MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt, e)
+            if not (isinstance(e, openai.error.RateLimitError) and scheduler.pause(delay)):
+                time.sleep(delay)
+            attempt += 1
+            sample["retries"] = attempt
+        except Exception:
+            scheduler.release(estimated)
+            raise
+
+
+def _create(messages, model, sample, stage, **params):
+    if api_base:
+        params.setdefault("api_base", api_base)
+    estimated = scheduler.estimate_tokens(messages, params)
+    response = _with_retries(
+        lambda: openai.ChatCompletion.create(model=model, messages=messages, **params), sample, stage, estimated
+    )
+    usage = response.get("usage") or {}
+    scheduler.release(estimated, usage.get("total_tokens"))
+    sample["prompt_tokens"] = usage.get("prompt_tokens", 0)
+    sample["completion_tokens"] = usage.get("completion_tokens", 0)
+    return response.choices[0].message["content"]
+
+
+# Un flux ne renvoie pas d'usage : les jetons sont estimés à partir des
+# messages et du texte reçu
+def _record_stream_usage(sample, messages, parts, model):
+    sample["prompt_tokens"] = sum(count_tokens(str(message.get("content", "")), model) for message in messages)
+    sample["completion_tokens"] = count_tokens("".join(parts), model) if parts else 0
+    return sample["prompt_tokens"] + sample["completion_tokens"]
+
+
+def _stream(messages, model, sample, stage, **params):
+    parts = []
+    if stream_source is not None:
+        try:
+            for delta in stream_source(messages, model, **params):
+                parts.append(delta)
+                yield delta
+        finally:
+            _record_stream_usage(sample, messages, parts, model)
+        return
+    if api_base:
+        params.setdefault("api_base", api_base)
+    estimated = scheduler.estimate_tokens(messages, params)
+    response = _with_retries(
+        lambda: openai.ChatCompletion.create(model=model, messages=messages, stream=True, **params),
+        sample, stage, estimated,
+    )
+    try:
+        for chunk in response:
+            delta = chunk.choices[0].delta.get("content")
+            if delta:
+                parts.append(delta)
+                yield delta
+    finally:
+        scheduler.release(estimated, _record_stream_usage(sample, messages, parts, model))
@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bornes (en secondes) des histogrammes de latence exposés à Prometheus
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
+
+logger = logging.getLogger("ef2c.metrics")
+if os.getenv("EF2C_METRICS_LOG"):
+    _handler = logging.FileHandler(os.getenv("EF2C_METRICS_LOG"))
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _new_stage():
+    return {
+        "count": 0,
+        "errors": 0,
+        "retries": 0,
+        "cache_hits": 0,
+        "seconds_sum": 0.0,
+        "seconds_max": 0.0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "buckets": [0] * len(BUCKETS),
+    }
+
+
+# Agrégats par étape (prompter, tabler, plan, chapter, quiz, module, pdf,
+# history...) : quelques additions sous verrou par appel, rien d'autre.
+class Metrics:
+    def __init__(self, keep_samples=int(os.getenv("EF2C_METRICS_SAMPLES", "0"))):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.gauges = {}
+        # Durées brutes conservées (par étape) pour les percentiles du benchmark
+        self.keep_samples = keep_samples
+        self.samples = {}
+
+    def record(self, stage, seconds, prompt_tokens=0, completion_tokens=0, retries=0, error=None, cache_hit=False):
+        with self.lock:
+            data = self.stages.get(stage)
+            if data is None:
+                data = self.stages[stage] = _new_stage()
+            data["count"] += 1
+            data["seconds_sum"] += seconds
+            data["seconds_max"] = max(data["seconds_max"], seconds)
+            data["prompt_tokens"] += prompt_tokens
+            data["completion_tokens"] += completion_tokens
+            data["retries"] += retries
+            data["errors"] += 1 if error else 0
+            data["cache_hits"] += 1 if cache_hit else 0
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    data["buckets"][index] += 1
+                    break
+            if self.keep_samples:
+                if stage not in self.samples:
+                    self.samples[stage] = deque(maxlen=self.keep_samples)
+                self.samples[stage].append(seconds)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "ts": round(time.time(), 3),
+                "stage": stage,
+                "seconds": round(seconds, 4),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "retries": retries,
+                "cache_hit": cache_hit,
+                "error": type(error).__name__ if error else None,
+            }))
+
+    # Jauges calculées à la demande, ex. register_gauges("ef2c_llm_cache", cache.stats)
+    def register_gauges(self, prefix, collect):
+        with self.lock:
+            self.gauges[prefix] = collect
+
+    def snapshot(self):
+        with self.lock:
+            stages = {stage: dict(data, buckets=list(data["buckets"])) for stage, data in self.stages.items()}
+            gauges = dict(self.gauges)
+        return {"stages": stages, "gauges": {prefix: collect() for prefix, collect in gauges.items()}}
+
+    def prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        counters = [
+            ("count", "ef2c_stage_calls_total"),
+            ("errors", "ef2c_stage_errors_total"),
+            ("retries", "ef2c_stage_retries_total"),
+            ("cache_hits", "ef2c_stage_cache_hits_total"),
+            ("prompt_tokens", "ef2c_stage_prompt_tokens_total"),
+            ("completion_tokens", "ef2c_stage_completion_tokens_total"),
+        ]
+        for key, name in counters:
+            lines.append(f"# TYPE {name} counter")
+            for stage, data in sorted(snapshot["stages"].items()):
+                lines.append(f'{name}{{stage="{stage}"}} {data[key]}')
+        lines.append("# TYPE ef2c_stage_seconds histogram")
+        for stage, data in sorted(snapshot["stages"].items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, data["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'ef2c_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'ef2c_stage_seconds_sum{{stage="{stage}"}} {data["seconds_sum"]:.6f}')
+            lines.append(f'ef2c_stage_seconds_count{{stage="{stage}"}} {data["count"]}')
+        for prefix, values in sorted(snapshot["gauges"].items()):
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def percentiles(self, stage, quantiles=(0.5, 0.95, 0.99)):
+        with self.lock:
+            values = sorted(self.samples.get(stage, ()))
+        if not values:
+            return {}
+        return {f"p{int(q * 100)}": values[min(len(values) - 1, int(q * len(values)))] for q in quantiles}
+
+    def reset(self):
+        with self.lock:
+            self.stages.clear()
+            self.samples.clear()
+
+
+metrics = Metrics()
+
+
+# Mesure un bloc ; le bloc peut compléter sample (tokens, retries, cache_hit)
+@contextmanager
+def timed(stage):
+    sample = {}
+    start = time.perf_counter()
+    try:
+        yield sample
+    except GeneratorExit:
+        # flux abandonné par le consommateur : ce n'est pas une erreur
+        metrics.record(stage, time.perf_counter() - start, **sample)
+        raise
+    except BaseException as e:
+        metrics.record(stage, time.perf_counter() - start, error=e, **sample)
+        raise
+    metrics.record(stage, time.perf_counter() - start, **sample)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            data = json.dumps(metrics.snapshot()).encode("utf-8")
+            content_type = "application/json"
+        elif self.path.startswith("/metrics"):
+            data = metrics.prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+# Démarre une seule fois par processus l'endpoint /metrics (texte Prometheus)
+# et /metrics.json si EF2C_METRICS_PORT est défini
+def serve_from_env():
+    global _server
+    port = os.getenv("EF2C_METRICS_PORT")
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("0.0.0.0", int(port)), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
@@ -0,0 +1,80 @@
+import hashlib
+import re
+
+# Titres de module du plan Tabler (api.py) : « Module 3 », « **Module 3: Titre** »,
+# « ### Module 3 - Titre », « | Module 3 | Titre | » ; « Module 3.2 » est une
+# sous-partie du module 3, pas un nouveau module
+MODULE_RE = re.compile(r"^[\s#*|>\-]*Module\s+(\d+)(?!\.\d)\b[\s*|]*[:.)\-–—]?\s*(.*?)[\s*|]*$", re.IGNORECASE)
+# Numérotation en tête d'un titre de chapitre (app.py) : « Chapitre 3 : »
+CHAPTER_NUMBER_RE = re.compile(r"^Chapitre\s*\d*\s*[:.)\-–—]?\s*")
+
+
+# Normalise une ligne pour que la mise en forme (gras, titres, espaces) ne
+# compte pas comme une modification
+def normalize(line):
+    return " ".join(line.replace("*", " ").replace("#", " ").replace("|", " ").split())
+
+
+def fingerprint(*parts):
+    return hashlib.sha256("\x1f".join(normalize(str(part)) for part in parts).encode("utf-8")).hexdigest()
+
+
+# Découpe le plan d'api.py en modules : {"number", "title", "lines", "text", "fingerprint"}.
+# Un module reprend toutes les lignes (leçons, descriptions) jusqu'au suivant ;
+# si un numéro revient, la dernière occurrence (le programme détaillé) l'emporte.
+def parse_modules(outline):
+    modules = {}
+    current = None
+    for line in (outline or "").splitlines():
+        match = MODULE_RE.match(line)
+        if match:
+            current = {"number": int(match.group(1)), "title": match.group(2).strip(), "lines": []}
+            modules[current["number"]] = current
+        elif current is not None and normalize(line):
+            current["lines"].append(normalize(line))
+    entries = [modules[number] for number in sorted(modules)]
+    for entry in entries:
+        entry["text"] = "\n".join([f"Module {entry['number']}: {entry['title']}".rstrip(": ")] + entry["lines"])
+        entry["fingerprint"] = fingerprint(entry["title"], *entry["lines"])
+    return entries
+
+
+# Découpe le plan d'app.py en chapitres (même règle qu'extract_chapters).
+# Le contenu d'un chapitre ne dépend que de son titre : l'empreinte porte sur le
+# titre sans sa numérotation, pour qu'une insertion ne renumérote pas tout le cours.
+def parse_chapters(course_plan):
+    entries = []
+    for line in (course_plan or "").splitlines():
+        if line.strip().startswith("Chapitre"):
+            entries.append({"number": len(entries) + 1, "title": line.strip(), "lines": []})
+        elif entries and normalize(line):
+            entries[-1]["lines"].append(normalize(line))
+    for entry in entries:
+        entry["text"] = "\n".join([entry["title"]] + entry["lines"])
+        entry["fingerprint"] = fingerprint(CHAPTER_NUMBER_RE.sub("", entry["title"]))
+    return entries
+
+
+# Compare deux arbres par numéro : ajoutés, modifiés, supprimés et inchangés
+def diff_outline(old_entries, new_entries):
+    old = {entry["number"]: entry["fingerprint"] for entry in old_entries}
+    new = {entry["number"]: entry["fingerprint"] for entry in new_entries}
+    return {
+        "added": [number for number in new if number not in old],
+        "changed": [number for number in new if number in old and old[number] != new[number]],
+        "removed": [number for number in old if number not in new],
+        "unchanged": [number for number in new if old.get(number) == new[number]],
+    }
+
+
+# Sépare les entrées déjà générées (retrouvées par empreinte, même si elles ont
+# été déplacées) de celles à générer. key(entry) construit la clé de known.
+def partition(entries, known, key=lambda entry: entry["fingerprint"]):
+    reused = {}
+    pending = []
+    for index, entry in enumerate(entries):
+        if key(entry) in known:
+            reused[index] = known[key(entry)]
+        else:
+            pending.append(index)
+    return reused, pending
@@ -0,0 +1,62 @@
+import hashlib
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from fpdf import FPDF
+
+from engine.metrics import timed
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "DejaVuSans.ttf")
+PDF_CACHE_ENTRIES = int(os.getenv("EF2C_PDF_CACHE_ENTRIES", "64"))
+
+
+# Rend le contenu en PDF directement en mémoire. ascii_only reproduit le
+# rendu d'api.py (Arial, accents retirés) ; sinon la police DejaVu est utilisée.
+def render_pdf(content, ascii_only=False):
+    with timed("pdf"):
+        return _render_pdf(content, ascii_only)
+
+
+def _render_pdf(content, ascii_only):
+    pdf = FPDF()
+    pdf.add_page()
+    if ascii_only:
+        content = unicodedata.normalize('NFKD', content).encode('ascii', 'ignore').decode('ascii')
+        pdf.set_font('Arial', size=12)
+    else:
+        pdf.add_font('DejaVu', '', FONT_PATH)
+        pdf.set_font('DejaVu', size=12)
+    pdf.multi_cell(0, 10, content)
+    return bytes(pdf.output())
+
+
+# Mémoïsation des PDF rendus, indexée par l'empreinte du contenu, avec
+# éviction LRU au-delà de max_entries.
+class PdfCache:
+    def __init__(self, max_entries=PDF_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, content, ascii_only=False):
+        key = hashlib.sha256(f"{ascii_only}:{content}".encode("utf-8")).hexdigest()
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                return data
+        data = render_pdf(content, ascii_only)
+        with self.lock:
+            self.entries[key] = data
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return data
+
+
+_cache = PdfCache()
+
+
+def pdf_bytes(content, ascii_only=False):
+    return _cache.get(content, ascii_only)
@@ -0,0 +1,140 @@
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_IN_FLIGHT = int(os.getenv("EF2C_MAX_IN_FLIGHT", "4"))
+
+# Places du lot le plus externe, vues depuis ses threads de travail. Un lot
+# imbriqué (ex. les morceaux du quiz d'un chapitre) prend ses places dans ce
+# même budget : le thread qui l'attend prête la sienne le temps de l'attente.
+_budget = contextvars.ContextVar("ef2c_budget", default=None)
+
+
+def _with_retries(func, retries, return_exceptions, on_retry=None):
+    def attempt(*args):
+        for remaining in range(retries, -1, -1):
+            try:
+                return func(*args)
+            except Exception as e:
+                if remaining == 0:
+                    if return_exceptions:
+                        return e
+                    raise
+                if on_retry:
+                    on_retry(*args)
+
+    return attempt
+
+
+# Exécute func sur chaque élément avec au plus max_in_flight appels simultanés.
+# Les résultats sont renvoyés dans l'ordre des éléments ; on_result est appelé
+# dans le thread appelant (donc compatible avec Streamlit) à chaque résultat.
+# Un élément en échec est relancé seul jusqu'à retries fois ; avec
+# return_exceptions, l'exception finale prend sa place au lieu d'interrompre le lot.
+def run_ordered(func, items, max_in_flight=MAX_IN_FLIGHT, on_result=None, retries=0, return_exceptions=False):
+    return stream_ordered(
+        lambda item, emit: func(item),
+        items,
+        max_in_flight=max_in_flight,
+        on_result=on_result,
+        retries=retries,
+        return_exceptions=return_exceptions,
+    )
+
+
+# Comme run_ordered, mais func(item, emit) peut publier des fragments de texte
+# avec emit(delta). Le thread appelant regroupe les fragments arrivés entre deux
+# réveils et appelle on_delta(index, texte_cumulé) une fois par élément et par lot.
+def stream_ordered(func, items, max_in_flight=MAX_IN_FLIGHT, on_delta=None, on_result=None, retries=0, return_exceptions=False):
+    items = list(items)
+    results = [None] * len(items)
+    if not items:
+        return results
+    events = queue.Queue()
+    outer = _budget.get()
+    budget = outer or threading.Semaphore(max(1, max_in_flight))
+
+    def task(index, item):
+        _budget.set(budget)
+
+        def emit(delta):
+            events.put(("delta", index, delta))
+
+        try:
+            with budget:
+                events.put(("done", index, attempt(item, emit)))
+        except BaseException as e:
+            events.put(("error", index, e))
+
+    # Un élément relancé repart d'un texte vide
+    attempt = _with_retries(func, retries, return_exceptions, on_retry=lambda item, emit: emit(None))
+
+    texts = {}
+    pending = len(items)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(items))))
+    if outer is not None:
+        outer.release()
+    try:
+        for index, item in enumerate(items):
+            # propage la session courante (engine.scheduler) au thread de travail
+            executor.submit(contextvars.copy_context().run, task, index, item)
+        while pending:
+            batch = [events.get()]
+            while True:
+                try:
+                    batch.append(events.get_nowait())
+                except queue.Empty:
+                    break
+            touched = []
+            for kind, index, value in batch:
+                if kind == "delta":
+                    texts[index] = "" if value is None else texts.get(index, "") + value
+                    if index not in touched:
+                        touched.append(index)
+                elif kind == "error":
+                    raise value
+                else:
+                    pending -= 1
+                    results[index] = value
+                    if index in touched:
+                        touched.remove(index)
+                    if on_result:
+                        on_result(index, value)
+            if on_delta:
+                for index in touched:
+                    on_delta(index, texts[index])
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if outer is not None:
+            outer.acquire()
+    return results
+
+
+# Génère chapitres et quiz en parallèle : le quiz d'un chapitre part dès que
+# son contenu est disponible, sans attendre les autres chapitres. Avec on_delta,
+# generate_content doit renvoyer un flux de fragments (ex. stream_chapter_content)
+# et le texte partiel de chaque chapitre est transmis au fil de la génération.
+def generate_chapters(chapter_titles, generate_content, generate_quiz, max_in_flight=MAX_IN_FLIGHT, on_result=None, on_delta=None, retries=0, return_exceptions=False):
+    def run(chapter_title, emit):
+        if on_delta:
+            parts = []
+            for delta in generate_content(chapter_title):
+                parts.append(delta)
+                emit(delta)
+            chapter_content = "".join(parts)
+        else:
+            chapter_content = generate_content(chapter_title)
+        quiz_content = generate_quiz(chapter_content)
+        return chapter_title, chapter_content, quiz_content
+
+    return stream_ordered(
+        run,
+        chapter_titles,
+        max_in_flight=max_in_flight,
+        on_delta=on_delta,
+        on_result=on_result,
+        retries=retries,
+        return_exceptions=return_exceptions,
+    )
@@ -0,0 +1,190 @@
+import json
+import math
+import os
+import re
+
+from engine import llm
+from engine.pipeline import run_ordered, MAX_IN_FLIGHT
+
+# Taille maximale d'un morceau de contenu envoyé au générateur de questions
+CHUNK_TOKENS = int(os.getenv("EF2C_QUIZ_CHUNK_TOKENS", "2000"))
+# Budget de jetons de prompt par quiz : au-delà, seuls des morceaux répartis
+# sur tout le chapitre sont envoyés
+BUDGET_TOKENS = int(os.getenv("EF2C_QUIZ_BUDGET_TOKENS", "8000"))
+# Nombre de candidats demandés par rapport au nombre de questions finales
+OVERSAMPLE = float(os.getenv("EF2C_QUIZ_OVERSAMPLE", "1.5"))
+# Un morceau doit fournir au moins ce nombre de candidats
+MIN_PER_CHUNK = 2
+# Budget de complétion par question candidate
+TOKENS_PER_QUESTION = 120
+# Deux questions dont les mots se recouvrent au-delà de ce seuil sont des doublons
+DUPLICATE_THRESHOLD = 0.7
+
+LETTERS = "ABCD"
+
+count_tokens = llm.count_tokens
+
+
+# Découpe le texte en morceaux d'au plus max_tokens, sur les paragraphes puis
+# les lignes ; une ligne trop longue est coupée sur les mots
+def split_chunks(text, max_tokens=CHUNK_TOKENS, model=llm.DEFAULT_MODEL):
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if count_tokens(paragraph, model) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for line in paragraph.splitlines():
+            if count_tokens(line, model) <= max_tokens:
+                pieces.append(line)
+                continue
+            words = line.split()
+            step = max(1, len(words) * max_tokens // count_tokens(line, model))
+            pieces += [" ".join(words[start:start + step]) for start in range(0, len(words), step)]
+
+    chunks = []
+    current, size = [], 0
+    for piece in pieces:
+        if not piece.strip():
+            continue
+        tokens = count_tokens(piece, model)
+        if current and size + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def chunk_messages(chunk, count):
+    prompt = f"""
+    Générez {count} questions à choix multiples portant uniquement sur l'extrait de cours ci-dessous.
+    Les questions doivent être variées, précises et couvrir les notions importantes de l'extrait.
+    Chaque question a 4 options avec une seule réponse correcte.
+    Répondez uniquement en JSON, sans texte autour, au format :
+    {{"questions": [{{"question": "...", "options": ["...", "...", "...", "..."], "answer": "A"}}]}}
+
+    Extrait :
+    {chunk}
+    """
+    return [{"role": "user", "content": prompt}]
+
+
+# Lit les questions candidates renvoyées par le modèle ; les entrées mal
+# formées sont ignorées. answer est ramené à l'indice de la bonne option.
+def parse_questions(text):
+    start = min((index for index in (text.find("{"), text.find("[")) if index >= 0), default=-1)
+    if start < 0:
+        return []
+    try:
+        data, _ = json.JSONDecoder().raw_decode(text[start:])
+    except ValueError:
+        return []
+    if isinstance(data, dict):
+        data = data.get("questions", [])
+
+    questions = []
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        question = str(item.get("question", "")).strip()
+        options = [str(option).strip() for option in item.get("options") or []]
+        answer = item.get("answer")
+        if isinstance(answer, str) and 1 <= len(answer.strip()) <= 2 and answer.strip().upper()[:1] in LETTERS:
+            answer = LETTERS.index(answer.strip().upper()[:1])
+        elif isinstance(answer, str) and answer.strip() in options:
+            answer = options.index(answer.strip())
+        if not question or len(options) != 4 or not isinstance(answer, int) or not 0 <= answer < 4:
+            continue
+        questions.append({"question": question, "options": options, "answer": answer})
+    return questions
+
+
+def _words(question):
+    return set(re.findall(r"\w+", question.lower()))
+
+
+# Fusionne les candidats de chaque morceau : doublons retirés, puis sélection
+# en alternant les morceaux pour couvrir tout le chapitre
+def merge_questions(candidates, count):
+    kept = []
+    unique = []
+    for questions in candidates:
+        chunk_questions = []
+        for question in questions:
+            words = _words(question["question"])
+            if any(len(words & other) / max(1, len(words | other)) >= DUPLICATE_THRESHOLD for other in kept):
+                continue
+            kept.append(words)
+            chunk_questions.append(question)
+        unique.append(chunk_questions)
+
+    selected = []
+    for rank in range(max((len(questions) for questions in unique), default=0)):
+        for questions in unique:
+            if rank < len(questions) and len(selected) < count:
+                selected.append(questions[rank])
+    return selected
+
+
+# Met les questions au format texte du quiz (affichage et PDF)
+def format_quiz(questions):
+    blocks = []
+    for number, question in enumerate(questions, 1):
+        lines = [f"{number}. {question['question']}"]
+        lines += [f"   {LETTERS[index]}) {option}" for index, option in enumerate(question["options"])]
+        lines.append(f"   Réponse correcte : {LETTERS[question['answer']]}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+# Garde au plus limit morceaux, régulièrement espacés du début à la fin
+def spread(chunks, limit):
+    if len(chunks) <= limit:
+        return chunks
+    if limit == 1:
+        return [chunks[len(chunks) // 2]]
+    return [chunks[round(index * (len(chunks) - 1) / (limit - 1))] for index in range(limit)]
+
+
+# Map-reduce : le contenu est découpé selon un budget de jetons, chaque morceau
+# produit des candidats (au plus max_in_flight à la fois), puis les candidats
+# sont fusionnés. call remplace llm.chat, par ex. pour passer par le limiteur
+# d'appels de l'appelant (engine.batch.limited).
+def generate_quiz_questions(content, num_questions=5, model=llm.DEFAULT_MODEL, max_in_flight=MAX_IN_FLIGHT, call=llm.chat):
+    wanted = math.ceil(num_questions * OVERSAMPLE)
+    limit = max(1, min(math.ceil(wanted / MIN_PER_CHUNK), BUDGET_TOKENS // CHUNK_TOKENS))
+    chunks = spread(split_chunks(content, CHUNK_TOKENS, model) or [content], limit)
+    per_chunk = max(MIN_PER_CHUNK, math.ceil(wanted / len(chunks)))
+    candidates = run_ordered(
+        lambda chunk: parse_questions(call(
+            chunk_messages(chunk, per_chunk),
+            model=model,
+            stage="quiz",
+            max_tokens=per_chunk * TOKENS_PER_QUESTION,
+        )),
+        chunks,
+        max_in_flight=max_in_flight,
+        retries=1,
+        return_exceptions=True,
+    )
+    return merge_questions([questions for questions in candidates if not isinstance(questions, Exception)], num_questions)
+
+
+def legacy_quiz_messages(chapter_content, num_questions=5):
+    prompt = f"""
+    Générez un quiz de {num_questions} questions à choix multiples basé sur : {chapter_content}
+    Chaque question doit avoir 4 options avec une seule réponse correcte clairement indiquée.
+    """
+    return [{"role": "user", "content": prompt}]
+
+
+# Quiz au format texte. Si aucun candidat n'a pu être lu, on revient à la
+# requête libre d'origine sur le premier morceau du contenu.
+def generate_quiz(content, num_questions=5, model=llm.DEFAULT_MODEL, max_in_flight=MAX_IN_FLIGHT, call=llm.chat):
+    questions = generate_quiz_questions(content, num_questions, model, max_in_flight, call)
+    if questions:
+        return format_quiz(questions)
+    first_chunk = (split_chunks(content, CHUNK_TOKENS, model) or [content])[0]
+    return call(legacy_quiz_messages(first_chunk, num_questions), model=model, stage="quiz")
@@ -0,0 +1,151 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from engine.metrics import metrics
+
+ENABLED = os.getenv("EF2C_SCHEDULER", "1") != "0"
+REQUESTS_PER_MINUTE = float(os.getenv("EF2C_RPM", "3500"))
+TOKENS_PER_MINUTE = float(os.getenv("EF2C_TPM", "90000"))
+# Part du quota utilisable en rafale, en secondes de fenêtre
+BURST_SECONDS = float(os.getenv("EF2C_BURST_SECONDS", "10"))
+COMPLETION_ESTIMATE = int(os.getenv("EF2C_COMPLETION_ESTIMATE", "800"))
+
+INTERACTIVE = 0
+BULK = 1
+INTERACTIVE_STAGES = {"prompter", "tabler", "plan", "outline"}
+
+# Session courante (onglet Streamlit, travail du backend, cours d'un lot) ;
+# engine.pipeline la propage aux threads qu'il lance
+current_session = contextvars.ContextVar("ef2c_session", default="default")
+
+
+def stage_priority(stage):
+    return INTERACTIVE if stage in INTERACTIVE_STAGES else BULK
+
+
+def estimate_tokens(messages, params):
+    prompt = sum(len(json.dumps(message, ensure_ascii=False)) for message in messages) // 4
+    return prompt + params.get("max_tokens", COMPLETION_ESTIMATE)
+
+
+# Seau à jetons borné pour ne jamais dépasser `limit` sur une fenêtre glissante
+# de `window` secondes : capacité (rafale) + débit * fenêtre = limit.
+class TokenBucket:
+    def __init__(self, limit, window=60.0, burst_seconds=BURST_SECONDS):
+        self.capacity = max(1.0, limit * min(burst_seconds, window) / window)
+        self.rate = max(limit - self.capacity, 1.0) / window
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Secondes à attendre avant de pouvoir prélever amount (0 si possible maintenant)
+    def wait_time(self, amount):
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+# Ordonnanceur unique par processus : toutes les sessions passent par lui pour
+# appeler l'API. Budget en requêtes/min et tokens/min (seaux à jetons), priorité
+# aux appels interactifs, tourniquet entre sessions à priorité égale, et pause
+# commune après un 429 au lieu de relances simultanées.
+class Scheduler:
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE, window=60.0):
+        self.condition = threading.Condition()
+        self.requests = TokenBucket(requests_per_minute, window)
+        self.tokens = TokenBucket(tokens_per_minute, window)
+        self.queues = {INTERACTIVE: OrderedDict(), BULK: OrderedDict()}
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.rate_limited = 0
+
+    def _next_ticket(self):
+        for priority in (INTERACTIVE, BULK):
+            for session, tickets in self.queues[priority].items():
+                return priority, session, tickets[0]
+        return None
+
+    def acquire(self, priority, tokens, session=None):
+        session = session or current_session.get()
+        ticket = object()
+        start = time.monotonic()
+        with self.condition:
+            self.queues[priority].setdefault(session, deque()).append(ticket)
+            while True:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                wait = self.paused_until - now
+                head = self._next_ticket()
+                if head[2] is ticket and wait <= 0:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        tickets = self.queues[priority].pop(session)
+                        tickets.popleft()
+                        if tickets:
+                            # la session repasse en fin de tour
+                            self.queues[priority][session] = tickets
+                        self.in_flight += 1
+                        self.condition.notify_all()
+                        break
+                self.condition.wait(timeout=wait if wait > 0 else None)
+        metrics.record("queue_wait", time.monotonic() - start)
+
+    # Ajuste le budget de tokens une fois la consommation réelle connue
+    def release(self, estimated, actual=None):
+        with self.condition:
+            self.in_flight -= 1
+            if actual is not None:
+                self.tokens.take(actual - estimated)
+            self.condition.notify_all()
+
+    # 429 reçu : toutes les sessions attendent avant le prochain envoi
+    def pause(self, seconds):
+        with self.condition:
+            self.rate_limited += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {
+                "queue_depth_interactive": sum(len(t) for t in self.queues[INTERACTIVE].values()),
+                "queue_depth_bulk": sum(len(t) for t in self.queues[BULK].values()),
+                "in_flight": self.in_flight,
+                "rate_limited_total": self.rate_limited,
+                "request_budget": round(self.requests.level, 2),
+                "token_budget": round(self.tokens.level, 2),
+            }
+
+
+scheduler = Scheduler()
+metrics.register_gauges("ef2c_scheduler", scheduler.stats)
+
+
+# Points d'entrée utilisés par engine.llm ; sans effet si EF2C_SCHEDULER=0
+def acquire(stage, tokens):
+    if ENABLED:
+        scheduler.acquire(stage_priority(stage), tokens)
+
+
+def release(estimated, actual=None):
+    if ENABLED:
+        scheduler.release(estimated, actual)
+
+
+# Renvoie True si l'attente est prise en charge par l'ordonnanceur
+def pause(seconds):
+    if ENABLED:
+        scheduler.pause(seconds)
+    return ENABLED
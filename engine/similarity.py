@@ -0,0 +1,258 @@
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from PyPDF2 import PdfReader
+from scipy.sparse import vstack
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.metrics.pairwise import linear_kernel
+
+from engine.metrics import metrics, timed
+
+INDEX_PATH = os.getenv("EF2C_SIMILARITY_PATH", ".cache/similarity.sqlite")
+CHAPTERS_DIR = os.getenv("EF2C_CHAPTERS_DIR", os.path.join("cours", "chapitres"))
+# Score cosinus TF-IDF à partir duquel un contenu existant est réutilisé
+THRESHOLD = float(os.getenv("EF2C_REUSE_THRESHOLD", "0.85"))
+ENABLED = os.getenv("EF2C_REUSE", "1") != "0"
+
+# Version du schéma : les requêtes indexées incluent le cours depuis la version 1,
+# les chapitres sont indexés sur leur seul titre depuis la version 2
+SCHEMA_VERSION = 2
+
+# Numérotation en tête d'un titre : « Chapitre 3 : », « # Chapitre 3 - », « Module 3: »
+NUMBER_RE = re.compile(r"^[#*\s]*(?:Chapitre|Module)\s*\d*\s*[:.)\-–—]?\s*", re.IGNORECASE)
+# Début de chapitre dans un PDF de cours (le titre est répété en titre markdown dans le contenu)
+PDF_CHAPTER_RE = re.compile(r"^Chapitre\s*(\d+)\b")
+PDF_QUIZ_RE = re.compile(r"^#*\s*Quiz\s*:?\s*$", re.IGNORECASE)
+# Titre du cours dans l'en-tête d'un PDF (« Titre : html css »)
+PDF_COURSE_RE = re.compile(r"^Titre\s*:\s*(.+)$")
+MIN_CONTENT_CHARS = 200
+
+# N-grammes de caractères hachés : sans vocabulaire figé, les termes absents de
+# l'index (« Python ») comptent dans la requête et font baisser le score
+VECTORIZER = HashingVectorizer(
+    analyzer="char_wb", ngram_range=(3, 5), n_features=2 ** 20, alternate_sign=False, norm=None, strip_accents="unicode"
+)
+
+
+# Texte comparé : lignes sans numérotation, espaces normalisés
+def matching_text(text):
+    lines = [NUMBER_RE.sub("", " ".join(line.split())) for line in (text or "").splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+# Requête d'un chapitre ou d'un module : le titre du cours, puis le texte
+# comparé (titre du chapitre ; titre et leçons d'un module). Sans le cours, des
+# titres génériques (« Introduction », « Conclusion ») se confondraient d'un
+# cours à l'autre. L'index et la recherche doivent porter sur les mêmes champs.
+def course_query(course_title, text):
+    return matching_text(f"Cours : {course_title}\n{text}")
+
+
+def pdf_course_title(path, text):
+    for line in text.splitlines()[:5]:
+        match = PDF_COURSE_RE.match(line.strip())
+        if match:
+            return match.group(1).strip()
+    return os.path.splitext(os.path.basename(path))[0].replace("_", " ")
+
+
+# Découpe le texte d'un PDF de cours en (titre, contenu, quiz). Un numéro de
+# chapitre peut apparaître dans l'en-tête puis au début du chapitre : seule la
+# dernière occurrence ouvre le chapitre.
+def split_pdf_chapters(text):
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    starts = {}
+    for position, line in enumerate(lines):
+        match = PDF_CHAPTER_RE.match(line)
+        if match:
+            starts[int(match.group(1))] = position
+    positions = sorted(starts.values())
+    chapters = []
+    for start, end in zip(positions, positions[1:] + [len(lines)]):
+        body = lines[start + 1:end]
+        quiz_at = next((index for index, line in enumerate(body) if PDF_QUIZ_RE.match(line)), len(body))
+        content = "\n".join(body[:quiz_at]).strip()
+        quiz = "\n".join(body[quiz_at + 1:]).strip()
+        if len(content) >= MIN_CONTENT_CHARS:
+            chapters.append((lines[start], content, quiz))
+    return chapters
+
+
+# Index local des chapitres (app.py) et modules (api.py) déjà générés. Les
+# documents sont stockés dans SQLite et ajoutés au fil de l'eau. Les vecteurs
+# hachés (n-grammes de caractères, robustes aux accents et aux pluriels) sont
+# gardés en mémoire et complétés à chaque ajout ; seuls les poids IDF sont
+# recalculés à la demande quand un type de document a changé.
+class SimilarityIndex:
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = None
+        self.models = {}
+        self.counts = {}
+        self.counters = {"lookups": 0, "hits": 0, "added": 0}
+
+    def _db(self):
+        if self.connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+            if version < SCHEMA_VERSION:
+                # Anciennes requêtes sans le cours : index reconstruit (PDF réimportés)
+                self.connection.execute("DROP TABLE IF EXISTS documents")
+                self.connection.execute("DROP TABLE IF EXISTS ingested")
+                self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, source TEXT NOT NULL, "
+                "key TEXT NOT NULL, title TEXT NOT NULL, query TEXT NOT NULL, content TEXT NOT NULL, "
+                "quiz TEXT NOT NULL DEFAULT '', created REAL NOT NULL, UNIQUE (kind, source, key))"
+            )
+            self.connection.execute("CREATE TABLE IF NOT EXISTS ingested (path TEXT PRIMARY KEY, signature TEXT NOT NULL)")
+        return self.connection
+
+    # query est le texte comparé (voir course_query) ; replace=False garde une
+    # entrée existante de même source et même titre
+    def add(self, kind, title, content, quiz="", source="", query=None, replace=True):
+        query = matching_text(query or title)
+        key = matching_text(title).lower()
+        if not query or not key or not content:
+            return False
+        with self.lock:
+            db = self._db()
+            old = db.execute(
+                "SELECT id FROM documents WHERE kind = ? AND source = ? AND key = ?", (kind, source, key)
+            ).fetchone()
+            cursor = db.execute(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO documents "
+                "(kind, source, key, title, query, content, quiz, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, source, key, title, query, content, quiz or "", time.time()),
+            )
+            db.commit()
+            if cursor.rowcount:
+                self._append(kind, cursor.lastrowid, query, old[0] if old else None)
+                self.models.pop(kind, None)
+                self.counters["added"] += 1
+            return bool(cursor.rowcount)
+
+    # Ajoute le vecteur haché d'un document (remplaçant replaced_id s'il existait)
+    def _append(self, kind, row_id, query, replaced_id=None):
+        if kind not in self.counts:
+            return
+        ids, counts = self.counts[kind]
+        if replaced_id in ids:
+            keep = [position for position, other in enumerate(ids) if other != replaced_id]
+            ids, counts = [ids[position] for position in keep], counts[keep]
+        self.counts[kind] = (ids + [row_id], vstack([counts, VECTORIZER.transform([query])]).tocsr())
+
+    def _model(self, kind):
+        model = self.models.get(kind)
+        if model is None:
+            if kind not in self.counts:
+                rows = self._db().execute("SELECT id, query FROM documents WHERE kind = ? ORDER BY id", (kind,)).fetchall()
+                if not rows:
+                    return None
+                self.counts[kind] = ([row_id for row_id, _ in rows], VECTORIZER.transform([query for _, query in rows]))
+            ids, counts = self.counts[kind]
+            transformer = TfidfTransformer(sublinear_tf=True).fit(counts)
+            model = self.models[kind] = (transformer, transformer.transform(counts), ids)
+        return model
+
+    # Renvoie le document le plus proche si son score atteint threshold, sinon None
+    def lookup(self, kind, query, threshold=THRESHOLD):
+        query = matching_text(query)
+        if not query:
+            return None
+        with timed("similarity"), self.lock:
+            self.counters["lookups"] += 1
+            model = self._model(kind)
+            if model is None:
+                return None
+            transformer, matrix, ids = model
+            scores = linear_kernel(transformer.transform(VECTORIZER.transform([query])), matrix).ravel()
+            best = int(scores.argmax())
+            if scores[best] < threshold:
+                return None
+            row = self._db().execute(
+                "SELECT title, content, quiz, source FROM documents WHERE id = ?", (ids[best],)
+            ).fetchone()
+            if row is None:
+                return None
+            self.counters["hits"] += 1
+            title, content, quiz, source = row
+            return {"title": title, "content": content, "quiz": quiz, "source": source, "score": float(scores[best])}
+
+    # Importe les chapitres d'un PDF de cours ; un fichier inchangé
+    # (taille et date) n'est pas relu
+    def ingest_pdf(self, path):
+        stat = os.stat(path)
+        signature = f"{stat.st_size}:{stat.st_mtime}"
+        with self.lock:
+            row = self._db().execute("SELECT signature FROM ingested WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == signature:
+            return 0
+        try:
+            text = "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+        except Exception:
+            text = ""
+        course_title = pdf_course_title(path, text)
+        added = sum(
+            self.add("chapter", title, content, quiz, source=path, query=course_query(course_title, title), replace=False)
+            for title, content, quiz in split_pdf_chapters(text)
+        )
+        with self.lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO ingested (path, signature) VALUES (?, ?)", (path, signature))
+            db.commit()
+        return added
+
+    def ingest_directory(self, directory=CHAPTERS_DIR):
+        return sum(self.ingest_pdf(path) for path in sorted(glob.glob(os.path.join(directory, "*.pdf"))))
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+            if self.connection is not None:
+                (stats["documents"],) = self.connection.execute("SELECT COUNT(*) FROM documents").fetchone()
+            return stats
+
+
+_index = None
+_index_lock = threading.Lock()
+
+metrics.register_gauges("ef2c_similarity", lambda: _index.stats() if _index else {})
+
+
+# Index partagé par tout le processus ; les PDF de cours/chapitres sont
+# importés à la première utilisation
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex()
+            _index.ingest_directory()
+        return _index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index de similarité des chapitres déjà générés")
+    parser.add_argument("directory", nargs="?", default=CHAPTERS_DIR)
+    parser.add_argument("--db", default=INDEX_PATH)
+    parser.add_argument("--query", help="titre de chapitre à rechercher après l'import")
+    parser.add_argument("--course", default="", help="titre du cours de la recherche")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+    index = SimilarityIndex(args.db)
+    print(f"{index.ingest_directory(args.directory)} chapitres importés dans {args.db}")
+    if args.query:
+        hit = index.lookup("chapter", course_query(args.course, args.query), args.threshold)
+        print(f"{hit['score']:.2f} {hit['title']} ({hit['source']})" if hit else "aucun chapitre proche")
@@ -0,0 +1,15 @@
+import openai
+import pytest
+
+from bench.mock_openai import start_server
+from engine import llm
+
+
+# Serveur OpenAI simulé (bench/mock_openai.py), sans latence
+@pytest.fixture
+def mock_openai(monkeypatch):
+    server, base = start_server(latency=0)
+    monkeypatch.setattr(openai, "api_key", "sk-test")
+    monkeypatch.setattr(llm, "api_base", base)
+    yield server
+    server.shutdown()
@@ -0,0 +1,36 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import backend
+from engine.client import BackendClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(backend, "BACKEND_TOKEN", "secret")
+    return TestClient(backend.app)
+
+
+def test_jobs_require_token(client):
+    assert client.post("/jobs", json={"kind": "pdf", "params": {"content": "x"}}).status_code == 401
+    assert client.get("/jobs/inconnu", headers={"X-EF2C-Token": "autre"}).status_code == 401
+    response = client.post("/jobs", json={"kind": "pdf", "params": {"content": "x"}}, headers={"X-EF2C-Token": "secret"})
+    assert response.status_code == 200
+    assert client.get(f"/jobs/{response.json()['id']}", headers={"X-EF2C-Token": "secret"}).status_code == 200
+
+
+def test_jobs_refused_without_configured_token(client, monkeypatch):
+    monkeypatch.setattr(backend, "BACKEND_TOKEN", "")
+    assert client.get("/jobs/inconnu", headers={"X-EF2C-Token": ""}).status_code == 503
+
+
+def test_no_cross_origin_by_default(client):
+    response = client.get("/metrics", headers={"Origin": "https://example.com"})
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_wait_gives_up_after_timeout(monkeypatch):
+    backend_client = BackendClient("http://backend", poll_interval=0.01, wait_timeout=0.05)
+    monkeypatch.setattr(backend_client, "status", lambda job_id: {"status": "running", "done": 0, "total": 1})
+    with pytest.raises(TimeoutError):
+        backend_client.wait("job")
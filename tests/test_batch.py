@@ -0,0 +1,59 @@
+import json
+import os
+
+from engine import batch, cache, llm
+from engine.metrics import metrics
+from engine.scheduler import current_session
+
+SPECS = [
+    {"id": "vba", "title": "Macros VBA", "duration": "2 jours", "audience": "Analystes", "objectives": "Automatiser Excel", "num_chapters": 3},
+    {"id": "sql", "title": "SQL", "duration": "1 jour", "audience": "Débutants", "objectives": "Requêtes", "num_chapters": 2},
+]
+
+
+def retries():
+    return sum(data["retries"] for data in metrics.snapshot()["stages"].values())
+
+
+def test_batch_resumes_from_checkpoints(mock_openai, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "ENABLED", False)
+    monkeypatch.setattr(llm, "BACKOFF_BASE", 0.01)
+    # 429 aléatoires, relancés par engine.llm
+    monkeypatch.setattr(mock_openai.RequestHandlerClass, "error_rate", 0.35)
+    monkeypatch.setattr(mock_openai.RequestHandlerClass, "rate_window", 0.01)
+    retries_before = retries()
+    generated = []
+    plans = []
+    generate_content = batch.generate_chapter_content
+    generate_plan = batch.generate_course_plan
+
+    def content(chapter_title, fail=None):
+        generated.append((current_session.get(), chapter_title))
+        if (current_session.get(), chapter_title) == fail:
+            raise RuntimeError("échec simulé")
+        return generate_content(chapter_title)
+
+    def plan(*args):
+        plans.append(args[0])
+        return generate_plan(*args)
+
+    monkeypatch.setattr(batch, "generate_course_plan", plan)
+    # Premier passage : le chapitre 2 du cours VBA échoue à chaque tentative
+    monkeypatch.setattr(batch, "generate_chapter_content", lambda chapter_title: content(chapter_title, ("vba", "Chapitre 2: Sujet 2")))
+    failures = batch.run_batch(SPECS, str(tmp_path), concurrency=2, parallel_courses=2, max_in_flight=2)
+    assert [spec["id"] for spec in failures] == ["vba"]
+    with open(tmp_path / ".checkpoints" / "vba.json", encoding="utf-8") as f:
+        state = json.load(f)
+    assert sorted(state["chapters"]) == ["1", "3"] and not state["done"]
+    assert os.path.exists(tmp_path / "chapitres" / "sql.pdf")
+    assert retries() > retries_before
+
+    # Second passage : le cours terminé est sauté, seul le chapitre manquant est généré
+    generated.clear()
+    plans.clear()
+    monkeypatch.setattr(batch, "generate_chapter_content", content)
+    assert batch.run_batch(SPECS, str(tmp_path), concurrency=2, parallel_courses=2, max_in_flight=2) == []
+    assert plans == []
+    assert generated == [("vba", "Chapitre 2: Sujet 2")]
+    assert os.path.exists(tmp_path / "chapitres" / "vba.pdf")
+    assert os.path.exists(tmp_path / "plan" / "plan_vba.pdf")
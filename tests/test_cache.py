@@ -0,0 +1,60 @@
+import pytest
+
+from engine import cache
+from engine.cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+def test_make_key_depends_on_request():
+    messages = [{"role": "user", "content": "Bonjour"}]
+    assert cache.make_key("m", messages, {"a": 1, "b": 2}) == cache.make_key("m", messages, {"b": 2, "a": 1})
+    assert cache.make_key("m", messages, {}) != cache.make_key("autre", messages, {})
+
+
+def test_memory_lru_eviction():
+    responses = ResponseCache(path=None, memory_entries=2)
+    responses.set("a", "A")
+    responses.set("b", "B")
+    assert responses.get("a") == "A"
+    responses.set("c", "C")
+    assert responses.get("b") is None
+    assert responses.get("a") == "A"
+    assert responses.get("c") == "C"
+
+
+def test_ttl_expiry_in_memory_and_on_disk(tmp_path, clock):
+    responses = ResponseCache(path=str(tmp_path / "cache.sqlite"), ttl=60)
+    responses.set("a", "A")
+    clock.now += 30
+    assert responses.get("a") == "A"
+    clock.now += 31
+    assert responses.get("a") is None
+    reopened = ResponseCache(path=str(tmp_path / "cache.sqlite"), ttl=60)
+    assert reopened.get("a") is None
+
+
+def test_disk_eviction_keeps_recently_used(tmp_path, clock):
+    responses = ResponseCache(path=str(tmp_path / "cache.sqlite"), memory_entries=1, disk_entries=2, ttl=0)
+    responses.set("a", "A")
+    clock.now += 1
+    responses.set("b", "B")
+    clock.now += 1
+    assert responses.get("a") == "A"
+    clock.now += 1
+    responses.set("c", "C")
+    reopened = ResponseCache(path=str(tmp_path / "cache.sqlite"), ttl=0)
+    assert [reopened.get(key) for key in "abc"] == ["A", None, "C"]
@@ -0,0 +1,69 @@
+import shelve
+import threading
+
+from engine import history
+from engine.history import HistoryStore
+
+
+def messages(count, prefix="message"):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"{prefix} {i}"} for i in range(count)]
+
+
+def test_append_and_load_pages(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite"))
+    store.append("a", messages(5))
+    store.append("b", messages(2, "autre"))
+    store.append("a", [])
+    page = store.load("a", limit=2)
+    assert [m["content"] for m in page] == ["message 3", "message 4"]
+    older = store.load("a", limit=2, before=page[0]["id"])
+    assert [m["content"] for m in older] == ["message 1", "message 2"]
+    assert [m["content"] for m in store.load("a", limit=None)] == [f"message {i}" for i in range(5)]
+    assert store.count("a") == 5 and store.count("b") == 2
+    store.clear("a")
+    assert store.load("a") == [] and store.count("b") == 2
+
+
+def make_shelve(tmp_path, count):
+    path = str(tmp_path / "chat_history")
+    with shelve.open(path) as db:
+        db["messages"] = messages(count)
+    return path
+
+
+def test_migrate_shelve_once(tmp_path):
+    shelve_path = make_shelve(tmp_path, 3)
+    store = HistoryStore(str(tmp_path / "history.sqlite"))
+    assert store.migrate_shelve(shelve_path, "s") == 3
+    assert store.migrate_shelve(shelve_path, "s") == 0
+    assert [m["content"] for m in store.load("s")] == ["message 0", "message 1", "message 2"]
+    assert HistoryStore(str(tmp_path / "missing.sqlite")).migrate_shelve(str(tmp_path / "absent")) == 0
+
+
+def test_concurrent_first_open_imports_once(tmp_path, monkeypatch):
+    shelve_path = make_shelve(tmp_path, 72)
+    db_path = str(tmp_path / "history.sqlite")
+    stores = [HistoryStore(db_path) for _ in range(4)]
+    # chaque store lit le shelve après avoir vérifié la clé meta : tous passent
+    # la vérification avant qu'un seul n'importe
+    barrier = threading.Barrier(len(stores))
+    shelve_open = shelve.open
+
+    def open_after_all_checked(*args, **kwargs):
+        barrier.wait()
+        return shelve_open(*args, **kwargs)
+
+    monkeypatch.setattr(history.shelve, "open", open_after_all_checked)
+    imported = []
+
+    def migrate(store):
+        imported.append(store.migrate_shelve(shelve_path, "s"))
+        store.append("s", [{"role": "user", "content": "après"}])
+
+    threads = [threading.Thread(target=migrate, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(imported) == [0, 0, 0, 72]
+    assert HistoryStore(db_path).count("s") == 72 + len(stores)
@@ -0,0 +1,23 @@
+from engine import llm
+from engine.metrics import metrics
+
+
+def stage_tokens(stage):
+    data = metrics.snapshot()["stages"][stage]
+    return data["prompt_tokens"], data["completion_tokens"]
+
+
+def test_stream_chat_records_estimated_tokens(mock_openai):
+    messages = [{"role": "user", "content": "Explique les boucles. " * 20}]
+    text = "".join(llm.stream_chat(messages, use_cache=False, stage="test_stream"))
+    assert len(text) == 3000
+    prompt_tokens, completion_tokens = stage_tokens("test_stream")
+    assert prompt_tokens == llm.count_tokens(messages[0]["content"])
+    assert completion_tokens == llm.count_tokens(text)
+
+
+def test_abandoned_stream_counts_received_text(mock_openai):
+    stream = llm.stream_chat([{"role": "user", "content": "Bonjour"}], use_cache=False, stage="test_abandoned")
+    first = next(stream)
+    stream.close()
+    assert stage_tokens("test_abandoned")[1] == llm.count_tokens(first)
@@ -0,0 +1,40 @@
+from engine.outline import diff_outline, parse_chapters, parse_modules, partition
+
+OUTLINE = """Course Title: Python
+**Module 1: Bases**
+Lesson 1.1: Variables
+| Module 2 | Fonctions |
+Lesson 2.1: Paramètres
+### Module 3 - Fichiers
+Lesson 3.1: Lecture
+"""
+
+
+def test_parse_modules_ignores_formatting():
+    entries = parse_modules(OUTLINE)
+    assert [(entry["number"], entry["title"]) for entry in entries] == [(1, "Bases"), (2, "Fonctions"), (3, "Fichiers")]
+    assert entries[1]["text"] == "Module 2: Fonctions\nLesson 2.1: Paramètres"
+    reformatted = parse_modules(OUTLINE.replace("**Module 1: Bases**", "Module 1: Bases"))
+    assert reformatted[0]["fingerprint"] == entries[0]["fingerprint"]
+
+
+def test_diff_outline():
+    old = parse_modules(OUTLINE)
+    new = parse_modules(OUTLINE.replace("Lesson 2.1: Paramètres", "Lesson 2.1: Retour").replace("Lesson 3.1: Lecture\n", "") + "Module 4: Tests\n")
+    new = [entry for entry in new if entry["number"] != 1]
+    assert diff_outline(old, new) == {"added": [4], "changed": [2, 3], "removed": [1], "unchanged": []}
+
+
+def test_partition_finds_moved_chapters_by_fingerprint():
+    old = parse_chapters("Chapitre 1 : Bases\nChapitre 2 : Boucles")
+    known = {entry["fingerprint"]: f"contenu {entry['title']}" for entry in old}
+    new = parse_chapters("Chapitre 1 : Installation\nChapitre 2 : Bases\nChapitre 3 : Boucles")
+    reused, pending = partition(new, known)
+    assert reused == {1: "contenu Chapitre 1 : Bases", 2: "contenu Chapitre 2 : Boucles"}
+    assert pending == [0]
+
+
+def test_sub_numbered_lines_stay_in_their_module():
+    entries = parse_modules("Module 1: Bases\nModule 1.1: Variables\nModule 1.2: Types\nModule 2: Fonctions")
+    assert [(entry["number"], entry["title"]) for entry in entries] == [(1, "Bases"), (2, "Fonctions")]
+    assert entries[0]["lines"] == ["Module 1.1: Variables", "Module 1.2: Types"]
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from engine.pipeline import run_ordered, stream_ordered
+
+
+def test_results_keep_item_order():
+    # les premiers éléments finissent en dernier
+    results = run_ordered(lambda n: time.sleep(0.01 * (5 - n)) or n * n, range(5), max_in_flight=5)
+    assert results == [0, 1, 4, 9, 16]
+
+
+def test_on_result_runs_on_calling_thread():
+    threads = []
+    calls = []
+    run_ordered(lambda n: n, range(4), max_in_flight=2,
+                on_result=lambda index, result: (threads.append(threading.current_thread()), calls.append((index, result))))
+    assert set(threads) == {threading.current_thread()}
+    assert sorted(calls) == [(0, 0), (1, 1), (2, 2), (3, 3)]
+
+
+def flaky(failures):
+    attempts = {}
+    lock = threading.Lock()
+
+    def func(item):
+        with lock:
+            attempts[item] = attempts.get(item, 0) + 1
+            count = attempts[item]
+        if count <= failures.get(item, 0):
+            raise ValueError(f"échec {item}")
+        return item
+
+    return func, attempts
+
+
+def test_retries_only_failed_items():
+    func, attempts = flaky({1: 2})
+    assert run_ordered(func, range(3), retries=2) == [0, 1, 2]
+    assert attempts == {0: 1, 1: 3, 2: 1}
+
+
+def test_exhausted_retries_raise_or_return_exception():
+    func, _ = flaky({1: 5})
+    with pytest.raises(ValueError):
+        run_ordered(func, range(3), retries=1)
+    func, attempts = flaky({1: 5})
+    results = run_ordered(func, range(3), retries=1, return_exceptions=True)
+    assert results[0] == 0 and results[2] == 2
+    assert isinstance(results[1], ValueError)
+    assert attempts[1] == 2
+
+
+def test_retry_resets_streamed_text():
+    attempts = []
+
+    def func(item, emit):
+        attempts.append(item)
+        emit("début ")
+        # laisse le thread appelant publier le texte partiel
+        time.sleep(0.05)
+        if len(attempts) == 1:
+            raise ValueError("coupure")
+        emit("fin")
+        time.sleep(0.05)
+        return "ok"
+
+    texts = []
+    results = stream_ordered(func, ["a"], retries=1, on_delta=lambda index, text: texts.append(text))
+    assert results == ["ok"]
+    assert texts[0] == "début "
+    assert texts[-1] == "début fin"
+
+
+def test_nested_pipelines_share_the_outer_budget():
+    lock = threading.Lock()
+    state = {"in_flight": 0, "peak": 0}
+
+    def work(item):
+        with lock:
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        time.sleep(0.02)
+        with lock:
+            state["in_flight"] -= 1
+        return item
+
+    results = run_ordered(lambda n: run_ordered(work, range(n * 10, n * 10 + 4)), range(3), max_in_flight=3)
+    assert results == [list(range(n * 10, n * 10 + 4)) for n in range(3)]
+    assert state["peak"] == 3
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+
+from engine import quiz
+from engine.batch import limited
+from engine.pipeline import generate_chapters
+
+
+def make_question(text, answer="B"):
+    return {"question": text, "options": ["un", "deux", "trois", "quatre"], "answer": answer}
+
+
+def test_parse_questions_reads_letters_and_option_text():
+    text = "Voici le quiz :\n" + json.dumps({"questions": [
+        make_question("Que vaut 1 + 1 ?", "b"),
+        make_question("Combien de côtés a un triangle ?", "trois"),
+        {"question": "Mal formée", "options": ["a", "b"], "answer": "A"},
+        make_question("Réponse hors limites ?", 7),
+        make_question("Réponse vide ?", ""),
+        make_question("Réponse blanche ?", "  "),
+    ]})
+    questions = quiz.parse_questions(text)
+    assert [question["answer"] for question in questions] == [1, 2]
+    assert quiz.parse_questions("pas de JSON") == []
+
+
+def test_merge_questions_drops_duplicates_and_alternates_chunks():
+    first = [make_question("Qu'est-ce qu'une boucle for ?"), make_question("À quoi sert une variable ?")]
+    second = [make_question("Qu'est-ce qu'une boucle for ?"), make_question("Comment déclarer une fonction ?")]
+    merged = quiz.merge_questions([first, second], 3)
+    assert [question["question"] for question in merged] == [
+        "Qu'est-ce qu'une boucle for ?",
+        "Comment déclarer une fonction ?",
+        "À quoi sert une variable ?",
+    ]
+
+
+# Faux llm.chat qui mesure le nombre d'appels simultanés
+class CountingChat:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def __call__(self, messages, **params):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        count = int(messages[0]["content"].split("Générez ")[1].split()[0])
+        prompt = messages[0]["content"]
+        return json.dumps({"questions": [make_question(f"Question {hash(prompt)} {i} ?") for i in range(count)]})
+
+
+def long_content():
+    return "\n\n".join(f"Paragraphe {i} : " + "notion " * 600 for i in range(12))
+
+
+def test_quiz_chunks_respect_max_in_flight():
+    chat = CountingChat()
+    text = quiz.generate_quiz(long_content(), 5, max_in_flight=2, call=chat)
+    assert text.count("Réponse correcte") == 5
+    assert chat.peak == 2
+
+
+def test_quiz_inside_pipeline_stays_within_limit():
+    chat = CountingChat()
+    generate_chapters(
+        [f"Chapitre {i}" for i in range(1, 5)],
+        lambda chapter_title: long_content(),
+        lambda chapter_content: quiz.generate_quiz(chapter_content, call=chat),
+        max_in_flight=2,
+    )
+    assert chat.peak <= 2
+
+
+def test_quiz_calls_share_caller_limiter():
+    chat = CountingChat()
+    semaphore = threading.BoundedSemaphore(1)
+    generate_chapters(
+        [f"Chapitre {i}" for i in range(1, 5)],
+        lambda chapter_title: long_content(),
+        lambda chapter_content: quiz.generate_quiz(chapter_content, call=limited(chat, semaphore)),
+        max_in_flight=4,
+    )
+    assert chat.peak == 1
+
+
+def test_quiz_chunks_run_in_parallel_inside_pipeline():
+    chat = CountingChat()
+    generate_chapters(
+        ["Chapitre 1"],
+        lambda chapter_title: long_content(),
+        lambda chapter_content: quiz.generate_quiz(chapter_content, call=chat),
+        max_in_flight=4,
+    )
+    assert chat.peak == 4
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from engine import llm, scheduler
+from engine.scheduler import BULK, INTERACTIVE, Scheduler, TokenBucket
+
+
+def test_token_bucket_refill_and_wait():
+    bucket = TokenBucket(600, window=60.0, burst_seconds=10)
+    assert bucket.capacity == 100
+    assert bucket.rate == pytest.approx(500 / 60)
+    bucket.take(100)
+    assert bucket.wait_time(50) == pytest.approx(50 / bucket.rate)
+    bucket.refill(bucket.updated + 3)
+    assert bucket.level == pytest.approx(25)
+    bucket.refill(bucket.updated + 3600)
+    assert bucket.level == bucket.capacity
+    # une demande plus grande que la rafale n'attend que la capacité
+    assert bucket.wait_time(10000) == 0
+
+
+def test_release_adjusts_token_budget():
+    sched = Scheduler(requests_per_minute=600, tokens_per_minute=6000)
+    sched.acquire(BULK, 500, session="a")
+    level = sched.tokens.level
+    sched.release(500, 800)
+    assert sched.tokens.level == pytest.approx(level - 300)
+    assert sched.in_flight == 0
+
+
+def test_round_robin_between_sessions_with_interactive_first():
+    sched = Scheduler()
+    order = []
+    take = sched.requests.take
+    # appelé sous le verrou de l'ordonnanceur par le thread servi
+    sched.requests.take = lambda amount: (order.append(threading.current_thread().name), take(amount))
+    sched.pause(0.2)
+    threads = []
+    for name, session, priority in (("a1", "a", BULK), ("a2", "a", BULK), ("a3", "a", BULK), ("b1", "b", BULK), ("c1", "c", INTERACTIVE)):
+        thread = threading.Thread(target=sched.acquire, args=(priority, 1, session), name=name)
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+    assert order == ["c1", "a1", "b1", "a2", "a3"]
+
+
+def test_stream_releases_actual_tokens(mock_openai, monkeypatch):
+    sched = Scheduler(tokens_per_minute=600000)
+    monkeypatch.setattr(scheduler, "scheduler", sched)
+    monkeypatch.setattr(scheduler, "ENABLED", True)
+    messages = [{"role": "user", "content": "Bonjour"}]
+    estimated = scheduler.estimate_tokens(messages, {"max_tokens": 50})
+    monkeypatch.setattr(sched.tokens, "refill", lambda now: None)
+    start = sched.tokens.level
+    text = "".join(llm.stream_chat(messages, use_cache=False, stage="test_release", max_tokens=50))
+    actual = llm.count_tokens("Bonjour") + llm.count_tokens(text)
+    assert actual > estimated
+    assert sched.tokens.level == pytest.approx(start - actual)
@@ -0,0 +1,82 @@
+from engine.similarity import SimilarityIndex, course_query, matching_text, split_pdf_chapters
+
+
+def make_index(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "similarity.sqlite"))
+    for title in ("Chapitre 1 : Introduction", "Chapitre 5 : Conclusion", "Chapitre 3 : Les boucles en VBA"):
+        index.add("chapter", title, "Contenu VBA. " * 50, "Quiz VBA", source="vba.pdf",
+                  query=course_query("Macros VBA Excel", title))
+    return index
+
+
+def test_matching_text_strips_numbering():
+    assert matching_text("# Chapitre 3 - Les  boucles\nModule 2: Bases") == "Les boucles\nBases"
+
+
+def test_generic_titles_do_not_match_across_courses(tmp_path):
+    index = make_index(tmp_path)
+    assert index.lookup("chapter", course_query("Python pour débutants", "Chapitre 1: Introduction")) is None
+    assert index.lookup("chapter", course_query("Python pour débutants", "Chapitre 6 - Conclusion")) is None
+
+
+def test_same_course_chapter_matches(tmp_path):
+    index = make_index(tmp_path)
+    hit = index.lookup("chapter", course_query("Macros VBA Excel", "Chapitre 2 : Les boucles en VBA"))
+    assert hit is not None
+    assert hit["title"] == "Chapitre 3 : Les boucles en VBA"
+    assert hit["quiz"] == "Quiz VBA"
+    assert hit["score"] >= 0.85
+
+
+def test_same_title_in_another_source_is_kept(tmp_path):
+    index = make_index(tmp_path)
+    assert index.add("chapter", "Chapitre 1 : Introduction", "Autre contenu. " * 50, source="php.pdf",
+                     query=course_query("php", "Chapitre 1 : Introduction"))
+    assert not index.add("chapter", "Chapitre 1 : Introduction", "Doublon. " * 50, source="vba.pdf", replace=False)
+    assert index.stats()["documents"] == 4
+
+
+def test_split_pdf_chapters_keeps_last_heading_and_quiz():
+    body = "\n".join(["Ligne de contenu assez longue pour être gardée."] * 10)
+    text = f"Titre : vba\nListe des chapitres :\nChapitre 1 : Intro\nChapitre 1 : Intro\n{body}\nQuiz:\n1. Question ?\nChapitre 2 : Court\ntrop court"
+    chapters = split_pdf_chapters(text)
+    assert [title for title, _, _ in chapters] == ["Chapitre 1 : Intro"]
+    assert chapters[0][2] == "1. Question ?"
+
+
+PLAN = """Prérequis : aucun
+Chapitre 1 : Introduction aux macros VBA
+Ce chapitre présente l'éditeur VBA, l'enregistreur de macros et la sécurité des classeurs.
+Les apprenants découvrent les modules, les procédures Sub et l'exécution pas à pas.
+Chapitre 2 : Les boucles en VBA
+Boucles For, For Each et Do While appliquées aux plages de cellules.
+"""
+
+
+def test_imported_pdf_chapter_matches_plan_entry(tmp_path):
+    from engine.course_pdf import CoursePdfBuilder
+    from engine.outline import parse_chapters
+
+    path = str(tmp_path / "Macros_VBA_Excel.pdf")
+    header = "Titre : Macros VBA Excel\nDurée : 2 jours\n\nListe des chapitres :\nChapitre 1 : Introduction aux macros\nChapitre 2 : Les boucles en VBA"
+    with CoursePdfBuilder(path, "Macros VBA Excel", header) as course_pdf:
+        course_pdf.add_chapter(1, "Chapitre 1 : Introduction aux macros", "Les macros automatisent Excel. " * 20, "1. Question ?")
+        course_pdf.add_chapter(2, "Chapitre 2 : Les boucles en VBA", "Une boucle répète des instructions. " * 20, "2. Question ?")
+    index = SimilarityIndex(str(tmp_path / "similarity.sqlite"))
+    assert index.ingest_pdf(path) == 2
+
+    entry = parse_chapters(PLAN)[1]
+    assert len(entry["text"].splitlines()) > 1
+    hit = index.lookup("chapter", course_query("Macros VBA Excel", entry["title"]))
+    assert hit is not None and hit["title"] == "Chapitre 2 : Les boucles en VBA"
+    assert index.lookup("chapter", course_query("Python pour débutants", entry["title"])) is None
+
+
+def test_added_documents_are_searchable_after_lookup(tmp_path):
+    index = make_index(tmp_path)
+    query = course_query("Macros VBA Excel", "Chapitre 7 : Les formulaires")
+    assert index.lookup("chapter", query) is None
+    index.add("chapter", "Chapitre 7 : Les formulaires", "Formulaires. " * 50, source="vba.pdf", query=query)
+    index.add("chapter", "Chapitre 7 : Les formulaires", "Formulaires v2. " * 50, source="vba.pdf", query=query)
+    assert index.lookup("chapter", query)["content"].startswith("Formulaires v2.")
+    assert len(index.counts["chapter"][0]) == index.stats()["documents"] == 4